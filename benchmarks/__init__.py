@@ -0,0 +1,10 @@
+"""Benchmarks for loading, querying and writing near-Earth object data.
+
+Each benchmark is a module that can be run from the project root:
+
+    $ python3 -m benchmarks.run --approaches 100k 1M --output results.json
+    $ python3 -m benchmarks.concurrency --threads 1 2 4 8
+
+The `benchmarks.generate` module produces the deterministic synthetic datasets
+(of 100k, 1M or 10M close approaches, or any other size) that they run on.
+"""
@@ -0,0 +1,104 @@
+"""Measure query throughput as the number of threads sharing one `NEODatabase` grows.
+
+Each reader thread repeatedly runs a mix of queries against the same database
+for a fixed duration, while an optional writer thread `refresh`es the database
+at a fixed interval. The number of completed queries per second is reported
+for each number of reader threads, as one JSON object per line.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.concurrency --threads 1 2 4 8 --refresh-interval 0.5
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import threading
+import time
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+TESTS_ROOT = PROJECT_ROOT / 'tests'
+
+# A mix of broad and selective queries, in `create_filters` terms.
+QUERIES = (
+    {},
+    {'date': datetime.date(2020, 3, 2)},
+    {'distance_max': 0.05, 'velocity_min': 10.0},
+    {'diameter_min': 1.0, 'hazardous': True},
+    {'start_date': datetime.date(2020, 6, 1), 'end_date': datetime.date(2020, 6, 30), 'hazardous': False},
+)
+
+
+def run(database, threads, duration, refresh=None, refresh_interval=None):
+    """Run the query mix from several reader threads at once.
+
+    :param database: The shared `NEODatabase`.
+    :param threads: The number of reader threads.
+    :param duration: The number of seconds for which to run the readers.
+    :param refresh: A 0-argument callable returning the `(neos, approaches)` for each refresh, or None.
+    :param refresh_interval: The number of seconds between refreshes.
+    :return: A dictionary describing the run.
+    """
+    stop = threading.Event()
+    completed = [0] * threads
+    refreshes = [0]
+
+    def reader(n):
+        while not stop.is_set():
+            for criteria in QUERIES:
+                for _ in database.query(create_filters(**criteria)):
+                    pass
+                completed[n] += 1
+
+    def writer():
+        while not stop.wait(refresh_interval):
+            database.refresh(*refresh())
+            refreshes[0] += 1
+
+    workers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+    if refresh and refresh_interval:
+        workers.append(threading.Thread(target=writer))
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    return {'benchmark': 'concurrency', 'threads': threads, 'seconds': round(elapsed, 3),
+            'queries': sum(completed), 'queries_per_second': round(sum(completed) / elapsed, 2),
+            'refreshes': refreshes[0], 'approaches': len(database.listapproach)}
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path, default=TESTS_ROOT / 'test-neos-2020.csv',
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', type=pathlib.Path, default=TESTS_ROOT / 'test-cad-2020.json',
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="The numbers of reader threads to measure.")
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help="The number of seconds to run the readers for each thread count.")
+    parser.add_argument('--refresh-interval', type=float,
+                        help="If given, refresh the database from the data files this often, in seconds.")
+    args = parser.parse_args()
+
+    neos, approaches = load_neos(args.neofile), load_approaches(args.cadfile)
+    database = NEODatabase(neos, approaches)
+    for threads in args.threads:
+        result = run(database, threads, args.duration,
+                     refresh=lambda: (neos, approaches), refresh_interval=args.refresh_interval)
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Generate synthetic, deterministic `neos.csv`- and `cad.json`-shaped data files.
+
+The generated files have the same layout as NASA's (the same CSV columns that
+`load_neos` reads, and the same JSON fields as the close approach API) and
+roughly the same proportions: about 16 close approaches per NEO, spread evenly
+in time over 1900-2200 and sorted by time, with a few percent of NEOs named or
+potentially hazardous and about a tenth with a known diameter. The same size
+and seed always produce byte-for-byte identical files.
+
+The close approach file is written as a stream, so even the 10M-approach
+dataset never has to fit in memory while it is generated.
+
+To generate a dataset from the project root, run:
+
+    $ python3 -m benchmarks.generate --approaches 1000000 --outdir benchmarks/data
+"""
+import argparse
+import csv
+import datetime
+import json
+import pathlib
+import random
+
+BENCHMARKS_ROOT = pathlib.Path(__file__).parent.resolve()
+DATA_ROOT = BENCHMARKS_ROOT / 'data'
+
+# The standard dataset sizes, in close approaches.
+SIZES = {'100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+
+APPROACHES_PER_NEO = 16
+NEO_FIELDS = ('id', 'spkid', 'full_name', 'pdes', 'name', 'prefix', 'neo', 'pha', 'H', 'diameter')
+CAD_FIELDS = ('des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max', 'v_rel', 'v_inf', 't_sigma_f', 'h')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+START = datetime.datetime(1900, 1, 1)
+END = datetime.datetime(2200, 1, 1)
+# The Julian date of `START`.
+START_JD = 2415020.5
+
+
+def dataset_paths(approaches, seed=0, outdir=DATA_ROOT):
+    """Return the paths of the NEO and close approach files of a generated dataset.
+
+    :param approaches: The number of close approaches in the dataset.
+    :param seed: The seed of the dataset's random number generator.
+    :param outdir: The directory holding generated datasets.
+    :return: A tuple of the paths of the NEO (CSV) and close approach (JSON) files.
+    """
+    outdir = pathlib.Path(outdir)
+    return outdir / f'neos-{approaches}-{seed}.csv', outdir / f'cad-{approaches}-{seed}.json'
+
+
+def designations(count):
+    """Return `count` distinct primary designations, numbered and provisional alike.
+
+    :param count: The number of designations.
+    :return: A list of designation strings.
+    """
+    result = []
+    for n in range(count):
+        if n % 3 == 0:
+            result.append(str(1000 + n))
+        else:
+            year, serial = 1990 + n % 31, n // 31
+            result.append(f"{year} {chr(65 + serial % 26)}{chr(65 + serial // 26 % 25)}{serial // 650 or ''}")
+    return result
+
+
+def write_neos(path, pdes, rng):
+    """Write a `neos.csv`-shaped file of NEOs with the given designations.
+
+    :param path: The path of the CSV file.
+    :param pdes: The primary designations of the NEOs.
+    :param rng: A seeded `random.Random`.
+    """
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(NEO_FIELDS)
+        for n, designation in enumerate(pdes):
+            name = f"Synthetic{n}" if rng.random() < 0.03 else ''
+            diameter = f"{rng.lognormvariate(-1.0, 1.2):.3f}" if rng.random() < 0.1 else ''
+            hazardous = 'Y' if rng.random() < 0.08 else 'N'
+            full_name = f"{designation} ({name})" if name else designation
+            writer.writerow((f"a{n:07d}", 2000000 + n, full_name, designation, name, '', 'Y', hazardous,
+                             f"{rng.uniform(10, 30):.1f}", diameter))
+
+
+def format_sigma(minutes):
+    """Format a time uncertainty, in minutes, as in the `t_sigma_f` field of the close approach API."""
+    if minutes < 1:
+        return '< 00:01'
+    days, minutes = divmod(int(minutes), 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{days}_{hours:02d}:{minutes:02d}" if days else f"{hours:02d}:{minutes:02d}"
+
+
+def write_approaches(path, pdes, count, rng):
+    """Write a `cad.json`-shaped file of close approaches, sorted by time.
+
+    :param path: The path of the JSON file.
+    :param pdes: The primary designations of the NEOs making the approaches.
+    :param count: The number of close approaches.
+    :param rng: A seeded `random.Random`.
+    """
+    step = (END - START).total_seconds() / 60 / max(count, 1)
+    with open(path, 'w') as outfile:
+        outfile.write('{"signature":{"source":"Synthetic close approach data","version":"1.1"},')
+        outfile.write(f'"count":"{count}","fields":{json.dumps(CAD_FIELDS)},"data":[\n')
+        for n in range(count):
+            minutes = (n + rng.random()) * step
+            when = START + datetime.timedelta(minutes=minutes)
+            distance = rng.uniform(0.0001, 0.5)
+            spread = distance * rng.choice((0.0, 1e-6, 1e-4, 1e-2))
+            velocity = rng.uniform(1, 40)
+            row = (rng.choice(pdes), str(rng.randint(1, 700)), f"{START_JD + minutes / 1440:.9f}",
+                   f"{when.year}-{MONTHS[when.month - 1]}-{when.day:02d} {when.hour:02d}:{when.minute:02d}",
+                   repr(distance), repr(distance - spread), repr(distance + spread),
+                   repr(velocity), repr(velocity * 0.99), format_sigma(rng.expovariate(1 / 30)),
+                   f"{rng.uniform(10, 30):.1f}")
+            outfile.write(('' if n == 0 else ',\n') + json.dumps(row))
+        outfile.write('\n]}\n')
+
+
+def generate(approaches, seed=0, outdir=DATA_ROOT, force=False):
+    """Generate a dataset, unless it has been generated already.
+
+    :param approaches: The number of close approaches in the dataset.
+    :param seed: The seed of the dataset's random number generator.
+    :param outdir: The directory holding generated datasets.
+    :param force: Whether to regenerate a dataset that already exists.
+    :return: A tuple of the paths of the NEO (CSV) and close approach (JSON) files.
+    """
+    neo_path, cad_path = dataset_paths(approaches, seed, outdir)
+    if force or not (neo_path.exists() and cad_path.exists()):
+        neo_path.parent.mkdir(parents=True, exist_ok=True)
+        rng = random.Random(seed)
+        pdes = designations(max(1, approaches // APPROACHES_PER_NEO))
+        write_neos(neo_path, pdes, rng)
+        write_approaches(cad_path, pdes, approaches, rng)
+    return neo_path, cad_path
+
+
+def parse_size(text):
+    """Parse a dataset size, either a standard name (such as '1M') or a number of approaches."""
+    if text in SIZES:
+        return SIZES[text]
+    try:
+        return int(text.replace('_', ''))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a number of approaches or one of {', '.join(SIZES)}.")
+
+
+def main():
+    """Generate datasets from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--approaches', type=parse_size, nargs='+', default=[SIZES['100k']],
+                        help=f"The sizes of the datasets to generate, as numbers or one of {', '.join(SIZES)}.")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the random number generator.")
+    parser.add_argument('--outdir', type=pathlib.Path, default=DATA_ROOT,
+                        help="The directory in which to save the datasets.")
+    parser.add_argument('--force', action='store_true', help="Regenerate datasets that already exist.")
+    args = parser.parse_args()
+
+    for approaches in args.approaches:
+        for path in generate(approaches, args.seed, args.outdir, args.force):
+            print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Benchmark loading, querying, writing and inspecting a synthetic dataset.
+
+Each benchmark is run `--repeat` times and its fastest wall time is kept. The
+results are saved as JSON (along with the commit, the Python version and the
+dataset size) so that runs on different commits can be compared:
+
+    $ python3 -m benchmarks.run --approaches 100k --output before.json
+    $ git checkout other-branch
+    $ python3 -m benchmarks.run --approaches 100k --output after.json
+    $ python3 -m benchmarks.run --compare before.json after.json
+
+Datasets are generated (once, and cached in `benchmarks/data`) by
+`benchmarks.generate`.
+"""
+import argparse
+import datetime
+import io
+import json
+import pathlib
+import platform
+import subprocess
+import tempfile
+import time
+
+from benchmarks.generate import DATA_ROOT, SIZES, generate, parse_size
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import inspect
+from write import write_to_csv, write_to_json
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+# Representative mixes of filters, in `create_filters` terms.
+QUERIES = {
+    'all': {},
+    'date': {'date': datetime.date(2020, 3, 2)},
+    'date_range': {'start_date': datetime.date(2020, 1, 1), 'end_date': datetime.date(2029, 12, 31)},
+    'close_fast': {'distance_max': 0.01, 'velocity_min': 20.0},
+    'large_hazardous': {'diameter_min': 1.0, 'hazardous': True},
+    'everything': {'start_date': datetime.date(1950, 1, 1), 'end_date': datetime.date(2150, 1, 1),
+                   'distance_min': 0.001, 'distance_max': 0.3, 'velocity_min': 5.0, 'velocity_max': 30.0,
+                   'diameter_max': 5.0, 'hazardous': False},
+}
+
+
+def best_of(repeat, function):
+    """Return the fastest wall time, in seconds, of calling a function several times.
+
+    :param repeat: The number of calls.
+    :param function: A 0-argument callable.
+    :return: The minimum elapsed time of a call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(neo_path, cad_path, repeat=3, write_limit=None):
+    """Run every benchmark on one dataset.
+
+    :param neo_path: The path of the dataset's NEO file.
+    :param cad_path: The path of the dataset's close approach file.
+    :param repeat: The number of times to run each benchmark.
+    :param write_limit: The maximum number of close approaches to write, or None for all of them.
+    :return: A dictionary mapping the name of each benchmark to its best time, in seconds.
+    """
+    results = {}
+    results['load_neos'] = best_of(repeat, lambda: load_neos(neo_path))
+    results['load_approaches'] = best_of(repeat, lambda: load_approaches(cad_path))
+
+    neos, approaches = load_neos(neo_path), load_approaches(cad_path)
+    results['database'] = best_of(repeat, lambda: NEODatabase(neos, approaches))
+    database = NEODatabase(neos, approaches)
+
+    for name, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        results[f'query_{name}'] = best_of(repeat, lambda: sum(1 for _ in database.query(filters)))
+
+    written = approaches[:write_limit]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results['write_to_csv'] = best_of(repeat, lambda: write_to_csv(written, pathlib.Path(tmpdir, 'out.csv')))
+        results['write_to_json'] = best_of(repeat, lambda: write_to_json(written, pathlib.Path(tmpdir, 'out.json')))
+
+    sample = neos[::max(1, len(neos) // 1000)]
+
+    def inspect_sample():
+        for neo in sample:
+            inspect(database, pdes=neo.designation, verbose=True, stdout=io.StringIO())
+
+    results['inspect'] = best_of(repeat, inspect_sample)
+    return results
+
+
+def current_commit():
+    """Return the hash of the checked-out commit, or None if it can't be determined."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    """Print the ratio of the times of each benchmark between two saved runs.
+
+    :param before_path: The path of the earlier run's JSON results.
+    :param after_path: The path of the later run's JSON results.
+    """
+    with open(before_path) as infile:
+        before = json.load(infile)
+    with open(after_path) as infile:
+        after = json.load(infile)
+
+    for size, results in after['results'].items():
+        baseline = before['results'].get(size, {})
+        print(f"{size} approaches ({(before['commit'] or '?')[:10]} -> {(after['commit'] or '?')[:10]}):")
+        for name, seconds in results.items():
+            if name in baseline:
+                print(f"  {name:<24}{baseline[name]:>10.4f}{seconds:>10.4f}{seconds / baseline[name]:>8.2f}x")
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--approaches', type=parse_size, nargs='+', default=[SIZES['100k']],
+                        help=f"The sizes of the datasets to benchmark, as numbers or one of {', '.join(SIZES)}.")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the generated datasets.")
+    parser.add_argument('--datadir', type=pathlib.Path, default=DATA_ROOT,
+                        help="The directory holding generated datasets.")
+    parser.add_argument('--repeat', type=int, default=3, help="The number of times to run each benchmark.")
+    parser.add_argument('--write-limit', type=int,
+                        help="The maximum number of close approaches to write in the write benchmarks.")
+    parser.add_argument('--output', type=pathlib.Path, help="A file in which to save the results as JSON.")
+    parser.add_argument('--compare', type=pathlib.Path, nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="Compare two saved results instead of running the benchmarks.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {'commit': current_commit(), 'python': platform.python_version(),
+              'repeat': args.repeat, 'seed': args.seed, 'results': {}}
+    for approaches in args.approaches:
+        neo_path, cad_path = generate(approaches, args.seed, args.datadir)
+        report['results'][str(approaches)] = results = run(neo_path, cad_path, args.repeat, args.write_limit)
+        for name, seconds in results.items():
+            print(f"{approaches:>10} {name:<24}{seconds:>10.4f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,487 @@
-"""A database class."""
+"""A database class.
 
+An `NEODatabase` may be shared between threads: any number of readers can query
+it while a writer occasionally `refresh`es its contents. The contents at any
+moment are held in an immutable `Snapshot`. Readers pick up the current
+snapshot once (at the start of a query) and never take a lock, while writers
+build a complete new snapshot and then swap it in with a single assignment, so
+a query sees either the old contents or the new contents - never a mixture.
+"""
+
+import array
+import asyncio
+import bisect
+import collections
+import datetime
+import heapq
+import itertools
 import operator
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from functools import cached_property
+except ImportError:
+    # Python < 3.8.
+    class cached_property:
+        """A property computed on first access and then stored on the instance, like `functools.cached_property`."""
+
+        def __init__(self, func):
+            self.func = func
+            self.__doc__ = func.__doc__
+
+        def __get__(self, instance, owner=None):
+            if instance is None:
+                return self
+            value = instance.__dict__[self.func.__name__] = self.func(instance)
+            return value
+
+# The comparators that NumPy applies element-wise to a whole array at once.
+VECTORIZED_OPS = frozenset((operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge))
+
+# The number of close approaches whose filter masks are evaluated at a time by `query`.
+MASK_CHUNK_SIZE = 4096
+
+
+class Columns:
+    """A column store of attributes of close approaches, for evaluating filters a batch at a time.
+
+    A column holds one value (such as the distance) per close approach, in the
+    order of `approaches`. Each column is built once, on first use, and is
+    shared with every window onto the same approaches. Columns are NumPy arrays
+    when NumPy is available, and `array.array`s (or lists, for values without a
+    typecode) otherwise.
+
+    A `Columns` can be a window onto a slice of the approaches, made with
+    `window`, in which case its columns are the matching slices.
+    """
+
+    def __init__(self, approaches, start=0, stop=None, cache=None):
+        """Create a new `Columns`.
+
+        :param approaches: A sequence of `CloseApproach`es.
+        :param start: The index of the first approach in this window.
+        :param stop: The index after the last approach in this window, or None for the end.
+        :param cache: The dictionary of full columns to share, or None for a new one.
+        """
+        self.approaches = approaches
+        self.start = start
+        self.stop = len(approaches) if stop is None else stop
+        self._cache = {} if cache is None else cache
+
+    def __len__(self):
+        """Return the number of approaches in this window."""
+        return self.stop - self.start
+
+    def window(self, start, stop):
+        """Return a `Columns` onto a slice of these approaches, sharing their columns.
+
+        :param start: The index of the first approach in the window, relative to this one.
+        :param stop: The index after the last approach in the window, relative to this one.
+        :return: A `Columns`.
+        """
+        return Columns(self.approaches, self.start + start, min(self.start + stop, self.stop), self._cache)
+
+    def column(self, name, get, typecode=None):
+        """Return a column of values, building it from every approach the first time.
+
+        :param name: The name of the column.
+        :param get: A 1-argument callable fetching the column's value from a `CloseApproach`.
+        :param typecode: An `array` typecode for the values (such as 'd'), or None to store any objects.
+        :return: The values of the approaches in this window.
+        """
+        values = self._cache.get(name)
+        if values is None:
+            values = [get(approach) for approach in self.approaches]
+            if numpy is not None:
+                values = numpy.array(values, dtype=typecode and numpy.dtype(typecode))
+            elif typecode is not None:
+                values = array.array(typecode, values)
+            self._cache[name] = values
+        if self.start == 0 and self.stop == len(self.approaches):
+            return values
+        return values[self.start:self.stop]
+
+    def compare(self, op, values, value):
+        """Compare every value of a column to a reference value.
+
+        :param op: A 2-argument comparator (such as `operator.le`).
+        :param values: A column, as returned by `column`.
+        :param value: The reference value, supplied as the second argument to `op`.
+        :return: A mask - a sequence of truth values, one per approach in this window.
+        """
+        if numpy is not None:
+            if op in VECTORIZED_OPS:
+                return numpy.asarray(op(values, value), dtype=bool)
+            return numpy.fromiter(map(op, values, itertools.repeat(value)), dtype=bool, count=len(values))
+        return bytearray(map(op, values, itertools.repeat(value)))
+
+    def select(self, mask):
+        """Return the approaches of this window whose value in a mask is true.
+
+        :param mask: A mask, as returned by `compare`.
+        :return: A list of `CloseApproach`es.
+        """
+        approaches = itertools.islice(self.approaches, self.start, self.stop)
+        return list(itertools.compress(approaches, mask))
+
+
+def mask_and(left, right):
+    """Combine two masks, so that a value is true where both are true."""
+    if numpy is not None:
+        return numpy.logical_and(left, right)
+    return bytearray(map(operator.and_, left, right))
+
+
+def mask_count(mask):
+    """Return the number of true values in a mask."""
+    if numpy is not None:
+        return int(numpy.count_nonzero(mask))
+    return len(mask) - mask.count(0)
+
+
+# The metrics that `NEODatabase.rolling` can compute for each window.
+ROLLING_METRICS = ('count', 'min_distance')
+
+# How `NEODatabase.query_distinct` ranks the matching approaches of each NEO, keeping the one with the lowest key.
+DISTINCT_PICKS = {
+    'first': operator.attrgetter('time'),
+    'closest': operator.attrgetter('distance'),
+    'fastest': lambda approach: -approach.velocity,
+}
+
+# The largest fraction of a snapshot's approaches worth gathering from a `SortedIndex` rather than scanning.
+INDEX_SELECTIVITY = 0.25
+
+
+def minutes(moment):
+    """Return a `datetime` as a number of minutes since the start of the proleptic Gregorian calendar.
+
+    :param moment: A naive `datetime`.
+    :return: A float that orders and subtracts like the `datetime`, at minute resolution and finer.
+    """
+    return (moment - datetime.datetime.min).total_seconds() / 60
+
+
+def utcnow():
+    """Return the current time as a naive `datetime` in UTC, like the times of close approaches."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def bisect_time(approaches, moment, lo=0):
+    """Find where a moment falls in a list of close approaches sorted by time, like `bisect.bisect_left`.
+
+    :param approaches: A list of `CloseApproach`es, sorted by time.
+    :param moment: A naive `datetime`.
+    :param lo: The index from which to search.
+    :return: The index of the first approach at or after `moment`, or `len(approaches)` if there is none.
+    """
+    hi = len(approaches)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if approaches[mid].time < moment:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# A summary of an NEO's close approaches: how many there are, the closest one, and the next one after `as_of`.
+NEOSummary = collections.namedtuple('NEOSummary', ('count', 'closest', 'next_approach', 'as_of'))
+
+
+def summarize(approaches, now):
+    """Summarize an NEO's close approaches.
+
+    :param approaches: The NEO's `CloseApproach`es, sorted by time.
+    :param now: A naive `datetime` in UTC after which to look for the next approach.
+    :return: An `NEOSummary`, whose `closest` and `next_approach` are None if there are no such approaches.
+    """
+    closest = min(approaches, key=operator.attrgetter('distance'), default=None)
+    n = bisect_time(approaches, now)
+    return NEOSummary(len(approaches), closest, approaches[n] if n < len(approaches) else None, now)
+
+
+class SortedIndex:
+    """The positions of close approaches, sorted by a numeric value, for range lookups with `bisect`.
+
+    Approaches whose value is NaN (unknown) are left out, since they never
+    satisfy a comparison. An index can be built over NEOs in the same way.
+    """
+
+    def __init__(self, approaches, get):
+        """Create a new `SortedIndex`.
+
+        :param approaches: A sequence of `CloseApproach`es (or `NearEarthObject`s).
+        :param get: A 1-argument callable fetching the (float) value to sort by from an element.
+        """
+        values = list(map(get, approaches))
+        positions = sorted((n for n, value in enumerate(values) if value == value), key=values.__getitem__)
+        self.keys = array.array('d', map(values.__getitem__, positions))
+        self.positions = array.array('l', positions)
+
+    def range(self, op, value):
+        """Return the slice of `keys` whose values satisfy `key OP value`.
+
+        :param op: One of `operator.le`, `lt`, `ge`, `gt` or `eq`.
+        :param value: The reference value.
+        :return: A tuple of the start and stop of the slice.
+        :raises ValueError: If `op` isn't supported.
+        """
+        if op is operator.le:
+            return 0, bisect.bisect_right(self.keys, value)
+        if op is operator.lt:
+            return 0, bisect.bisect_left(self.keys, value)
+        if op is operator.ge:
+            return bisect.bisect_left(self.keys, value), len(self.keys)
+        if op is operator.gt:
+            return bisect.bisect_right(self.keys, value), len(self.keys)
+        if op is operator.eq:
+            return bisect.bisect_left(self.keys, value), bisect.bisect_right(self.keys, value)
+        raise ValueError(f"Unsupported comparator for a sorted index: {op!r}")
+
+    def count(self, op, value):
+        """Return the number of approaches whose value satisfies `key OP value`."""
+        start, stop = self.range(op, value)
+        return stop - start
+
+    def positions_matching(self, op, value):
+        """Return the positions, in ascending order, of the approaches whose value satisfies `key OP value`."""
+        start, stop = self.range(op, value)
+        return sorted(self.positions[start:stop])
+
+
+class PrefixIndex:
+    """A sorted array of strings, searchable by prefix (ignoring case) with `bisect`."""
+
+    def __init__(self, items):
+        """Create a new `PrefixIndex`.
+
+        :param items: A collection of `(text, value)` pairs, to be found by prefixes of `text`.
+        """
+        self.entries = sorted(items, key=lambda item: (item[0].casefold(), item[0]))
+        self.keys = [text.casefold() for text, _ in self.entries]
+
+    def search(self, prefix):
+        """Generate the entries whose text starts with a prefix, ignoring case, in sorted order.
+
+        :param prefix: The prefix to search for.
+        :return: A stream of matching `(text, value)` pairs.
+        """
+        prefix = prefix.casefold()
+        for n in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[n].startswith(prefix):
+                return
+            yield self.entries[n]
+
+
+class Snapshot:
+    """The contents of an `NEODatabase` at one epoch.
+
+    A snapshot is never modified after it has been built. Anything derived from
+    its contents (such as an index) can therefore be cached on the snapshot
+    itself and shared by every reader of that epoch.
+    """
+
+    def __init__(self, neos, approaches, epoch=0, now=None):
+        """Create a new `Snapshot`, linking NEOs and close approaches together.
+
+        Each NEO's approaches are sorted by time and kept, as a tuple, in
+        `approaches_by_neo`, with an `NEOSummary` of them in `summaries`. The
+        NEO objects themselves are shared with other snapshots - each one's
+        `approaches` attribute is replaced with a fresh list of its approaches
+        in the latest snapshot - so readers of a snapshot should look an NEO's
+        approaches up in `approaches_by_neo`. Close approaches whose NEO isn't
+        in `neos` are left out.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param approaches: A collection of `CloseApproach`es.
+        :param epoch: The number of this snapshot among the database's snapshots.
+        :param now: The naive `datetime` in UTC as of which to summarize the NEOs. Defaults to the current time.
+        """
+        self.epoch = epoch
+        self.neos = list(neos)
+        self.by_designation = {}
+        self.by_name = {}
+        for neo in self.neos:
+            self.by_designation[neo.designation] = neo
+            if neo.name:
+                self.by_name.setdefault(neo.name, neo)
+
+        linked = {neo: [] for neo in self.neos}
+        self.approaches = []
+        for approach in approaches:
+            neo = self.by_designation.get(approach.designation)
+            if neo is None:
+                continue
+            approach.neo = neo
+            linked[neo].append(approach)
+            self.approaches.append(approach)
+
+        # The data files are sorted by time already, in which case each sort is a linear check.
+        by_time = operator.attrgetter('time')
+        now = now or utcnow()
+        self.approaches_by_neo = {}
+        self.summaries = {}
+        for neo, neo_approaches in linked.items():
+            neo_approaches.sort(key=by_time)
+            neo.approaches = neo_approaches
+            self.approaches_by_neo[neo] = tuple(neo_approaches)
+            self.summaries[neo] = summarize(neo_approaches, now)
+
+        self._sorted_indexes = {}
+
+    @cached_property
+    def columns(self):
+        """Return the `Columns` of this snapshot's close approaches."""
+        return Columns(self.approaches)
+
+    def sorted_index(self, name, get):
+        """Return a `SortedIndex` of this snapshot's close approaches, building it the first time.
+
+        :param name: The name under which to cache the index.
+        :param get: A 1-argument callable fetching the value to sort by from a `CloseApproach`.
+        :return: A `SortedIndex`.
+        """
+        index = self._sorted_indexes.get(name)
+        if index is None:
+            index = self._sorted_indexes[name] = SortedIndex(self.approaches, get)
+        return index
+
+    def candidates(self, name, get, op, value):
+        """Gather the close approaches whose value satisfies `key OP value`, if that is selective.
+
+        :param name: The name of the `sorted_index` to use.
+        :param get: A 1-argument callable fetching the indexed value from a `CloseApproach`.
+        :param op: A comparator supported by `SortedIndex.range`.
+        :param value: The reference value.
+        :return: A list of the matching approaches, in their usual order - or None if more than
+                 `INDEX_SELECTIVITY` of the approaches match, in which case scanning them is cheaper.
+        """
+        index = self.sorted_index(name, get)
+        if index.count(op, value) > INDEX_SELECTIVITY * len(self.approaches):
+            return None
+        return [self.approaches[n] for n in index.positions_matching(op, value)]
+
+    @cached_property
+    def diameter_index(self):
+        """Return a `SortedIndex` of the positions of this snapshot's NEOs with a known diameter, by diameter."""
+        return SortedIndex(self.neos, operator.attrgetter('diameter'))
+
+    @cached_property
+    def hazardous_bitmap(self):
+        """Return a `bytearray` with a 1 for each potentially hazardous NEO of this snapshot, and a 0 otherwise."""
+        return bytearray(bool(neo.hazardous) for neo in self.neos)
+
+    @cached_property
+    def designation_index(self):
+        """Return a `PrefixIndex` of the primary designations of this snapshot's NEOs."""
+        return PrefixIndex((neo.designation, neo) for neo in self.neos)
+
+    @cached_property
+    def name_index(self):
+        """Return a `PrefixIndex` of the names of this snapshot's named NEOs."""
+        return PrefixIndex((neo.name, neo) for neo in self.neos if neo.name)
+
+
+def approach_key(approach):
+    """Return the key by which a close approach is recognized across reloads of the data.
+
+    Two `CloseApproach`es with the same key describe the same event, even if
+    they were parsed from different versions of the data files.
+
+    :param approach: A `CloseApproach`.
+    :return: A hashable tuple of the approach's NEO designation, time, distance and velocity.
+    """
+    return approach.designation, approach.time, approach.distance, approach.velocity
+
+
+def filter_key(approach_filter):
+    """Return the key under which statistics about a filter are accumulated.
+
+    Filters of the same type and comparator (such as every `--max-distance`
+    filter, whatever its value) share a key. Filters on a flag are keyed by
+    their value too, since `--hazardous` and `--not-hazardous` pass opposite rows.
+
+    :param approach_filter: A filter, such as an `AttributeFilter`.
+    :return: A string naming the filter's type and comparator.
+    """
+    op = getattr(approach_filter, 'op', None)
+    name = approach_filter.__class__.__name__
+    if op is None:
+        return name
+    value = getattr(approach_filter, 'value', None)
+    if isinstance(value, bool):
+        return f"{name}({op.__name__}, {value})"
+    return f"{name}({op.__name__})"
 
-import filters as ft
+
+class QueryStats:
+    """Counters describing one or more queries of an `NEODatabase`.
+
+    For each query, the rows scanned, the rows yielded and the time spent
+    scanning are counted, along with - for each type of filter, by its
+    `filter_key` - how many rows it was evaluated on and how many of those it
+    rejected. Filters are evaluated in order and stop at the first rejection,
+    so a filter is only evaluated on the rows that every earlier filter passed.
+    """
+
+    def __init__(self):
+        """Create a new, empty `QueryStats`."""
+        self.queries = 0
+        self.scanned = 0
+        self.yielded = 0
+        self.seconds = 0.0
+        self.evaluated = {}
+        self.rejected = {}
+
+    def pass_rate(self, key, default=0.5):
+        """Return the fraction of evaluated rows that a type of filter has let through.
+
+        :param key: The `filter_key` of a filter.
+        :param default: The fraction to assume for a type of filter that hasn't been evaluated yet.
+        :return: A number between 0 and 1.
+        """
+        evaluated = self.evaluated.get(key, 0)
+        if not evaluated:
+            return default
+        return 1 - self.rejected.get(key, 0) / evaluated
+
+    def order(self, filters):
+        """Order filters so that the most selective (by past pass rate) are evaluated first.
+
+        The filters of a query are all required to match, so they can be
+        evaluated in any order without changing the results. Filters with equal
+        pass rates keep their given order.
+
+        :param filters: A collection of filters.
+        :return: A list of the same filters, most selective first.
+        """
+        return sorted(filters, key=lambda approach_filter: self.pass_rate(filter_key(approach_filter)))
+
+    def merge(self, other):
+        """Add the counters of another `QueryStats` to these.
+
+        :param other: A `QueryStats`.
+        """
+        self.queries += other.queries
+        self.scanned += other.scanned
+        self.yielded += other.yielded
+        self.seconds += other.seconds
+        for key, count in other.evaluated.items():
+            self.evaluated[key] = self.evaluated.get(key, 0) + count
+        for key, count in other.rejected.items():
+            self.rejected[key] = self.rejected.get(key, 0) + count
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return (f"QueryStats(queries={self.queries}, scanned={self.scanned}, yielded={self.yielded}, "
+                f"seconds={self.seconds:.3f})")
 
 
 class NEODatabase:
@@ -21,11 +500,127 @@ class NEODatabase:
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
         """
-        self.listneo = neos
-        self.listapproach = approaches
+        self._write_lock = threading.Lock()
+        self._snapshot = Snapshot(neos, approaches)
+
+        # Statistics accumulated over every query, and those of the latest query.
+        self._stats_lock = threading.Lock()
+        self.stats = QueryStats()
+        self.last_stats = None
+
+    @property
+    def snapshot(self):
+        """Return the current `Snapshot` of this database's contents."""
+        return self._snapshot
+
+    @property
+    def epoch(self):
+        """Return the epoch of the current snapshot, which increases with every refresh."""
+        return self._snapshot.epoch
+
+    @property
+    def listneo(self):
+        """Return the collection of `NearEarthObject`s in the current snapshot."""
+        return self._snapshot.neos
+
+    @property
+    def listapproach(self):
+        """Return the collection of `CloseApproach`es in the current snapshot."""
+        return self._snapshot.approaches
+
+    def refresh(self, neos, approaches):
+        """Replace the contents of this database.
+
+        The new snapshot is built completely before it is swapped in, so
+        queries that are already running carry on over the old contents, and
+        queries started afterwards see only the new contents. Concurrent
+        refreshes are applied one at a time.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param approaches: A collection of `CloseApproach`es.
+        :return: The new `Snapshot`.
+        """
+        with self._write_lock:
+            snapshot = Snapshot(neos, approaches, epoch=self._snapshot.epoch + 1)
+            self._snapshot = snapshot
+        return snapshot
+
+    def diff(self, approaches):
+        """Compare a new collection of close approaches with the current contents.
+
+        Close approaches are matched by `approach_key`. Approaches whose NEO
+        isn't in the database are ignored, since they would never be linked.
+
+        :param approaches: A collection of `CloseApproach`es, such as a fresh load of the data file.
+        :return: A tuple of the list of added approaches (from `approaches`) and the list of removed
+                 approaches (from the current snapshot).
+        """
+        snapshot = self._snapshot
+        current = {}
+        for approach in snapshot.approaches:
+            current.setdefault(approach_key(approach), []).append(approach)
+
+        added = []
+        for approach in approaches:
+            matches = current.get(approach_key(approach))
+            if matches:
+                matches.pop()
+            elif approach.designation in snapshot.by_designation:
+                added.append(approach)
+        removed = [approach for matches in current.values() for approach in matches]
+        return added, removed
+
+    def apply(self, added=(), removed=()):
+        """Add and remove close approaches, keeping the rest of the contents as they are.
+
+        Like `refresh`, this builds a new snapshot and swaps it in, but every
+        unchanged `CloseApproach` object is carried over from the current
+        snapshot. The added approaches are merged in by time, so contents that
+        were sorted by time stay sorted.
+
+        :param added: A collection of `CloseApproach`es to add.
+        :param removed: A collection of `CloseApproach`es, from the current snapshot, to remove.
+        :return: The new `Snapshot`.
+        """
+        by_time = operator.attrgetter('time')
+        with self._write_lock:
+            current = self._snapshot
+            removed = {id(approach) for approach in removed}
+            kept = (approach for approach in current.approaches if id(approach) not in removed)
+            approaches = heapq.merge(kept, sorted(added, key=by_time), key=by_time)
+            snapshot = Snapshot(current.neos, approaches, epoch=current.epoch + 1)
+            self._snapshot = snapshot
+        return snapshot
+
+    def approaches_within(self, distance, certain=False):
+        """Find the close approaches that could possibly, or certainly, pass within a distance.
 
-        for values in self.listapproach:
-            values.neo.approaches.append(values)
+        Each approach is treated as the interval between its 3-sigma minimum
+        and maximum distances. It possibly passes within `distance` if its
+        minimum distance does, and certainly does if its maximum distance does.
+
+        :param distance: The distance from Earth, in au.
+        :param certain: Whether the whole interval must be within `distance`, rather than any of it.
+        :return: A list of the matching `CloseApproach`es, in their usual order.
+        """
+        snapshot = self._snapshot
+        name = 'distance_max' if certain else 'distance_min'
+        index = snapshot.sorted_index(name, operator.attrgetter(name))
+        return [snapshot.approaches[n] for n in index.positions_matching(operator.le, distance)]
+
+    def count_approaches_within(self, distances, certain=False):
+        """Count the close approaches that could possibly, or certainly, pass within each of many distances.
+
+        Each count takes a binary search of a sorted index, so sweeping many
+        thresholds costs little more than one.
+
+        :param distances: A collection of distances from Earth, in au.
+        :param certain: As for `approaches_within`.
+        :return: A list of counts, one per distance.
+        """
+        name = 'distance_max' if certain else 'distance_min'
+        index = self._snapshot.sorted_index(name, operator.attrgetter(name))
+        return [index.count(operator.le, distance) for distance in distances]
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -37,11 +632,7 @@ class NEODatabase:
         :param designation: The primary designation of the NEO to search for.
         :return: The `NearEarthObject` with the desired primary designation, or `None`.
         """
-        for desig in self.listneo:
-            if desig.designation == designation:
-                return desig
-
-        return
+        return self._snapshot.by_designation.get(designation)
 
     def get_neo_by_name(self, name):
         """Find and return an NEO by its name.
@@ -55,13 +646,119 @@ class NEODatabase:
         :param name: The name, as a string, of the NEO to search for.
         :return: The `NearEarthObject` with the desired name, or `None`.
         """
-        for val in self.listneo:
-            if val.name == name:
-                return val
+        return self._snapshot.by_name.get(name)
+
+    def get_neos_by_prefix(self, prefix, limit=None):
+        """Find NEOs whose primary designation or name starts with a prefix.
+
+        The matching ignores case. NEOs matched by designation come first, in
+        order of designation, followed by those matched only by name, in order
+        of name.
+
+        :param prefix: The start of the primary designation or name of the NEOs to search for.
+        :param limit: The maximum number of NEOs to return, or None for all of them.
+        :return: A list of matching `NearEarthObject`s.
+        """
+        snapshot = self._snapshot
+        matches = itertools.chain(snapshot.designation_index.search(prefix), snapshot.name_index.search(prefix))
+        neos = {}
+        for _, neo in matches:
+            if limit is not None and len(neos) >= limit:
+                break
+            neos.setdefault(neo, None)
+        return list(neos)
+
+    def complete(self, prefix, field='designation'):
+        """Return the primary designations (or names) of NEOs that start with a prefix.
+
+        :param prefix: The start of a primary designation or name, ignoring case.
+        :param field: Which to complete - 'designation' or 'name'.
+        :return: A sorted list of the distinct matching designations or names.
+        """
+        snapshot = self._snapshot
+        index = snapshot.name_index if field == 'name' else snapshot.designation_index
+        return list(dict.fromkeys(text for text, _ in index.search(prefix)))
+
+    def approaches_of(self, neo, start_date=None, end_date=None, limit=None):
+        """Return an NEO's close approaches on or between two dates.
+
+        An NEO's approaches are sorted by time in the current snapshot, so the
+        range is found with a binary search rather than by checking every
+        approach.
+
+        :param neo: A `NearEarthObject`.
+        :param start_date: The first `date` of the range, or None for no lower bound.
+        :param end_date: The last `date` of the range (inclusive), or None for no upper bound.
+        :param limit: The maximum number of approaches to return (the earliest ones), or None for all of them.
+        :return: A list of the NEO's `CloseApproach`es in the range, in order of time.
+        """
+        approaches = self._snapshot.approaches_by_neo.get(neo, ())
+        start, stop = 0, len(approaches)
+        if start_date is not None:
+            start = bisect_time(approaches, datetime.datetime.combine(start_date, datetime.time()))
+        if end_date is not None:
+            end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time())
+            stop = bisect_time(approaches, end, start)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return list(approaches[start:stop])
 
-        return
+    def summary(self, neo, now=None):
+        """Return a summary of an NEO's close approaches.
 
-    def query(self, filtDict=()):
+        The summaries of the current snapshot's NEOs are computed when it is
+        built, so this is a lookup - unless the next approach has passed since
+        then, or a different `now` is given, in which case the next approach is
+        looked up again.
+
+        :param neo: A `NearEarthObject`.
+        :param now: A naive `datetime` in UTC after which to find the next approach. Defaults to the current time.
+        :return: An `NEOSummary`.
+        """
+        snapshot = self._snapshot
+        summary = snapshot.summaries.get(neo)
+        if now is None:
+            now = utcnow()
+            if summary is not None and (summary.next_approach is None or summary.next_approach.time >= now):
+                return summary
+        return summarize(snapshot.approaches_by_neo.get(neo, ()), now)
+
+    def query_neos(self, diameter_min=None, diameter_max=None, hazardous=None):
+        """Query NEOs to generate those with a diameter in a range and a given hazardous flag.
+
+        A diameter range is looked up in the snapshot's `diameter_index` (so
+        NEOs of unknown diameter never match one), and the hazardous flag is
+        checked in its `hazardous_bitmap`, without visiting other NEOs.
+
+        :param diameter_min: The smallest diameter, in kilometers, or None for no lower bound.
+        :param diameter_max: The largest diameter, in kilometers, or None for no upper bound.
+        :param hazardous: Whether the NEOs must be potentially hazardous (True) or not (False), or None for either.
+        :return: A generator of the matching `NearEarthObject`s, in the order of the NEO data file.
+        """
+        snapshot = self._snapshot
+        if diameter_min is not None or diameter_max is not None:
+            index = snapshot.diameter_index
+            start, stop = 0, len(index.keys)
+            if diameter_min is not None:
+                start = index.range(operator.ge, diameter_min)[0]
+            if diameter_max is not None:
+                stop = index.range(operator.le, diameter_max)[1]
+            positions = sorted(index.positions[start:max(start, stop)])
+        else:
+            positions = None
+
+        if hazardous is not None:
+            bitmap, flag = snapshot.hazardous_bitmap, int(bool(hazardous))
+            if positions is None:
+                positions = _find_all(bitmap, flag)
+            else:
+                positions = (n for n in positions if bitmap[n] == flag)
+        elif positions is None:
+            positions = range(len(snapshot.neos))
+
+        return (snapshot.neos[n] for n in positions)
+
+    def query(self, filters=(), stats=None):
         """Query close approaches to generate those that match a collection of filters.
 
         This generates a stream of `CloseApproach` objects that match all of the
@@ -70,112 +767,334 @@ class NEODatabase:
         The `CloseApproach` objects are generated in internal order, which isn't
         guaranteed to be sorted meaninfully, although is often sorted by time.
 
-        :param filtDict:
+        The filters are evaluated in order of their selectivity in earlier
+        queries, most selective first. If every filter has a `mask` method (as
+        every `AttributeFilter` does), they are evaluated on `MASK_CHUNK_SIZE`
+        approaches at a time over the snapshot's `Columns`, rather than one
+        approach at a time. If any filter has a `candidates` method (such as a
+        `DesignationFilter`) that gathers the approaches it can pass from an
+        index, only the smallest such gathering is scanned. The rows scanned, rejected by each
+        filter and yielded, and the time spent scanning, are added to `stats`
+        (and recorded as `last_stats`) once the stream is exhausted or closed.
+        Since `last_stats` may be replaced by another thread's query, a caller
+        that wants the counters of its own query can pass a `QueryStats` in.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param stats: A `QueryStats` to which this query's counters are also added, or None.
         :return: A stream of matching `CloseApproach` objects.
         """
-        simple_date = filtDict["date"]
-        start_date = filtDict['start_date']
-        end_date = filtDict['end_date']
-        max_distance = filtDict['distance_max']
-        min_distance = filtDict['distance_min']
-        max_velocity = filtDict['velocity_max']
-        min_velocity = filtDict['velocity_min']
-        max_diameter = filtDict['diameter_max']
-        min_diameter = filtDict['diameter_min']
-        haz = filtDict['hazardous']
+        with self._stats_lock:
+            filters = self.stats.order(filters)
+        rejected = [0] * len(filters)
+        scanned = yielded = 0
+        seconds = 0.0
 
-        # Logic for counter values.
-        arg_counter = 0
-        for v in filtDict.values():
-            if v:
-                arg_counter = arg_counter + 1
+        snapshot = self._snapshot
+        start = time.perf_counter()
+        # A filter that can gather the approaches it may pass (from an index) saves scanning the rest.
+        candidates = None
+        for approach_filter in filters:
+            if hasattr(approach_filter, 'candidates'):
+                gathered = approach_filter.candidates(snapshot)
+                if gathered is not None and (candidates is None or len(gathered) < len(candidates)):
+                    candidates = gathered
+        try:
+            if candidates is None and filters and all(hasattr(approach_filter, 'mask') for approach_filter in filters):
+                # Evaluate the filters on a chunk of approaches at a time, as masks.
+                columns = snapshot.columns
+                for offset in range(0, len(columns), MASK_CHUNK_SIZE):
+                    chunk = columns.window(offset, offset + MASK_CHUNK_SIZE)
+                    scanned += len(chunk)
+                    passed, mask = len(chunk), None
+                    for n, approach_filter in enumerate(filters):
+                        filter_mask = approach_filter.mask(chunk)
+                        mask = filter_mask if mask is None else mask_and(mask, filter_mask)
+                        count = mask_count(mask)
+                        rejected[n] += passed - count
+                        passed = count
+                        if not passed:
+                            break
+                    if not passed:
+                        continue
+                    for approach in chunk.select(mask):
+                        yielded += 1
+                        # Don't count the time that the consumer spends between results.
+                        seconds += time.perf_counter() - start
+                        yield approach
+                        start = time.perf_counter()
+                return
 
-        # if haz or not haz:
-        #     arg_counter = arg_counter + 1
+            for approach in snapshot.approaches if candidates is None else candidates:
+                scanned += 1
+                for n, approach_filter in enumerate(filters):
+                    if not approach_filter(approach):
+                        rejected[n] += 1
+                        break
+                else:
+                    yielded += 1
+                    # Don't count the time that the consumer spends between results.
+                    seconds += time.perf_counter() - start
+                    yield approach
+                    start = time.perf_counter()
+        finally:
+            seconds += time.perf_counter() - start
+            self._record_stats(filters, rejected, scanned, yielded, seconds, stats)
 
-        # print("The arg counter value at beginning is: ", arg_counter)
-        for approach in self.listapproach:
+    def query_distinct(self, filters=(), pick='first'):
+        """Query close approaches to generate one per NEO of those that match a collection of filters.
 
-            final_counter = 0
+        The matches are grouped by NEO in a single pass over `query`, which
+        keeps only the best match of each NEO so far, and only those are then
+        sorted by time. (The order of `query`'s matches doesn't matter.)
 
-            if simple_date:
-                dt = ft.DateFilter(operator.eq, simple_date)
+        :param filters: A collection of filters, as for `query`.
+        :param pick: One of `DISTINCT_PICKS` - which of an NEO's matches to keep: the earliest, the nearest to
+                     Earth or the fastest (the earliest, on a tie).
+        :return: A stream of matching `CloseApproach`es, at most one per `NearEarthObject`, in order of time.
+        :raises ValueError: If `pick` is unknown.
+        """
+        if pick not in DISTINCT_PICKS:
+            raise ValueError(f"Unknown pick {pick!r}: use one of {', '.join(DISTINCT_PICKS)}.")
+        return self._query_distinct(filters, pick)
 
-                if dt(approach):
-                    final_counter += 1
-                else:
-                    continue
+    def _query_distinct(self, filters, pick):
+        pick_key, best = DISTINCT_PICKS[pick], {}
 
-            if start_date:
-                dt_start = ft.DateFilter(operator.ge, start_date)
-                if dt_start(approach):
-                    final_counter += 1
-                else:
-                    continue
+        def key(approach):
+            # Break ties by time, whatever order the matches arrive in.
+            return pick_key(approach), approach.time
 
-            if end_date:
-                dt_end = ft.DateFilter(operator.le, end_date)
-                if dt_end(approach):
-                    final_counter += 1
-                else:
-                    continue
+        for approach in self.query(filters):
+            current = best.get(approach.neo)
+            if current is None or key(approach) < key(current):
+                best[approach.neo] = approach
+        yield from sorted(best.values(), key=operator.attrgetter('time'))
 
-            if max_distance:
-                dt_distance = ft.DistanceFilter(operator.le, max_distance)
-                if dt_distance(approach):
-                    final_counter += 1
-                else:
-                    continue
+    def _record_stats(self, filters, rejected, scanned, yielded, seconds, caller_stats=None):
+        """Add the counters of a finished query to `stats` (and `caller_stats`), and record them as `last_stats`."""
+        stats = QueryStats()
+        stats.queries, stats.scanned, stats.yielded, stats.seconds = 1, scanned, yielded, seconds
+        evaluated = scanned
+        for approach_filter, count in zip(filters, rejected):
+            key = filter_key(approach_filter)
+            stats.evaluated[key] = stats.evaluated.get(key, 0) + evaluated
+            stats.rejected[key] = stats.rejected.get(key, 0) + count
+            evaluated -= count
 
-            if min_distance:
-                dt_distance = ft.DistanceFilter(operator.ge, min_distance)
-                if dt_distance(approach):
-                    final_counter += 1
-                else:
-                    continue
+        with self._stats_lock:
+            self.stats.merge(stats)
+            self.last_stats = stats
+        if caller_stats is not None:
+            caller_stats.merge(stats)
 
-            if min_velocity:
-                dt_velocity = ft.VelocityFilter(operator.ge, min_velocity)
-                if dt_velocity(approach):
-                    final_counter += 1
-                else:
-                    continue
+    def stats_copy(self):
+        """Return a copy of `stats`, taken under the lock so that no query's counters are half-merged into it."""
+        copy = QueryStats()
+        with self._stats_lock:
+            copy.merge(self.stats)
+        return copy
 
-            if max_velocity:
-                dt_velocity = ft.VelocityFilter(operator.le, max_velocity)
-                if dt_velocity(approach):
-                    final_counter += 1
-                else:
-                    continue
+    def query_many(self, filter_sets, limits=None):
+        """Query close approaches for many collections of filters in one shared scan.
 
-            if min_diameter:
-                dt_diameter = ft.DiameterFilter(operator.ge, min_diameter)
-                if dt_diameter(approach):
-                    final_counter += 1
-                else:
-                    continue
+        Each close approach is visited once and routed to every collection of
+        filters that it matches. A collection stops collecting results once it
+        has reached its limit, and the scan ends early once every collection
+        has.
 
-            if max_diameter:
-                dt_diameter = ft.DiameterFilter(operator.le, max_diameter)
-                if dt_diameter(approach):
-                    final_counter += 1
-                else:
-                    continue
-
-            if haz is None:
-                final_counter = final_counter
-            elif haz:
-                dt_haz = ft.HazardFilter(operator.eq, haz)
-                if dt_haz(approach):
-                    final_counter += 1
+        :param filter_sets: A sequence of collections of filters, each as for `query`.
+        :param limits: A sequence of the maximum number of results for each collection of
+            filters (0 or None for no limit), or None to collect every match.
+        :return: A list of lists of matching `CloseApproach` objects, one per collection of filters.
+        """
+        results = [[] for _ in filter_sets]
+        limits = limits or [None] * len(filter_sets)
+        active = [(tuple(filters), results[n], limits[n] or float('inf'))
+                  for n, filters in enumerate(filter_sets)]
+
+        for approach in self._snapshot.approaches:
+            saturated = False
+            for filters, matches, limit in active:
+                if all(approach_filter(approach) for approach_filter in filters):
+                    matches.append(approach)
+                    saturated = saturated or len(matches) >= limit
+            if saturated:
+                active = [query for query in active if len(query[1]) < query[2]]
+                if not active:
+                    break
+
+        return results
+
+    def coincident(self, window, filters=()):
+        """Find groups of close approaches by distinct NEOs that happen close together in time.
+
+        The matching approaches are swept in order of time. Each group is
+        anchored at its first approach, and an approach joins the current group
+        if it happens within `window` of that first approach; otherwise it
+        closes the group and starts the next one. So no group spans more than
+        `window`. Groups of approaches by only one NEO are skipped.
+
+        :param window: A `datetime.timedelta` - the most time between the first and last approaches in a group.
+        :param filters: A collection of filters that every approach in a group must match, as for `query`.
+        :return: A stream of groups, each a time-ordered list of `CloseApproach`es.
+        """
+        group = []
+        for approach in sorted(self.query(filters), key=operator.attrgetter('time')):
+            if group and approach.time - group[0].time > window:
+                if len({member.neo for member in group}) > 1:
+                    yield group
+                group = []
+            group.append(approach)
+        if len({member.neo for member in group}) > 1:
+            yield group
+
+    def nearest(self, when, k=10, filters=()):
+        """Find the close approaches nearest in time to a moment, before or after it, that match filters.
+
+        The approaches are looked up in an index sorted by time: a binary search
+        finds where `when` falls, and the search expands outward from there - to
+        whichever of the next earlier and next later approach is nearer in time -
+        until `k` of them match the filters.
+
+        :param when: A naive `datetime` (or a `date`, meaning midnight).
+        :param k: The number of approaches to find.
+        :param filters: A collection of filters that the approaches must match, as for `query`.
+        :return: A list of (at most) `k` matching `CloseApproach`es, in order of time.
+        """
+        if not isinstance(when, datetime.datetime):
+            when = datetime.datetime.combine(when, datetime.time())
+        snapshot = self._snapshot
+        index = snapshot.sorted_index('time', lambda approach: minutes(approach.time))
+        keys, positions, target = index.keys, index.positions, minutes(when)
+
+        found = []
+        before = bisect.bisect_left(keys, target) - 1
+        after = before + 1
+        while len(found) < k and (before >= 0 or after < len(keys)):
+            # Take the nearer of the two candidates, preferring the earlier one on a tie.
+            if after >= len(keys) or (before >= 0 and target - keys[before] <= keys[after] - target):
+                n, before = before, before - 1
+            else:
+                n, after = after, after + 1
+            approach = snapshot.approaches[positions[n]]
+            if all(approach_filter(approach) for approach_filter in filters):
+                found.append(approach)
+        return sorted(found, key=operator.attrgetter('time'))
+
+    def rolling(self, filters=(), window_days=30, step_days=None, metric='count', start=None):
+        """Compute a metric of the matching close approaches in each window of a sliding time window.
+
+        The windows are `window_days` long and start every `step_days`, from
+        midnight on `start` (or on the day of the earliest match) until the
+        latest match. The matches are sorted by time once, and then the start
+        and end of the window each advance through them (along with a queue of
+        candidates for the nearest approach), so every window costs amortized
+        constant time rather than a query of its own.
+
+        :param filters: A collection of filters that the counted approaches must match, as for `query`.
+        :param window_days: The length of each window, in days.
+        :param step_days: The number of days between the starts of consecutive windows. Defaults to `window_days`.
+        :param metric: One of `ROLLING_METRICS` - the number of approaches, or the nearest approach distance.
+        :param start: The `date` on which the first window starts, or None for the day of the earliest match.
+        :return: A stream of `(window_start, window_end, value)` tuples, where `window_end` is exclusive, and
+                 `value` is None for the nearest distance of an empty window.
+        :raises ValueError: If the metric is unknown or the window or step isn't positive.
+        """
+        if metric not in ROLLING_METRICS:
+            raise ValueError(f"Unknown metric {metric!r}: use one of {', '.join(ROLLING_METRICS)}.")
+        if window_days <= 0 or (step_days is not None and step_days <= 0):
+            raise ValueError("The window and step must be positive numbers of days.")
+        window = datetime.timedelta(days=window_days)
+        step = datetime.timedelta(days=step_days or window_days)
+        return self._rolling(filters, window, step, metric, start)
+
+    def _rolling(self, filters, window, step, metric, start):
+        approaches = sorted(self.query(filters), key=operator.attrgetter('time'))
+        if not approaches:
+            return
+        window_start = datetime.datetime.combine(start or approaches[0].time.date(), datetime.time())
+
+        # The approaches in [lo, hi) are in the current window. `nearest` holds the indices of the
+        # approaches in the window that are nearer than every later one, so its head is the nearest.
+        lo = hi = 0
+        nearest = collections.deque()
+        while window_start <= approaches[-1].time:
+            window_end = window_start + window
+            while lo < len(approaches) and approaches[lo].time < window_start:
+                lo += 1
+            hi = max(hi, lo)
+            while hi < len(approaches) and approaches[hi].time < window_end:
+                distance = approaches[hi].distance
+                while nearest and approaches[nearest[-1]].distance >= distance:
+                    nearest.pop()
+                nearest.append(hi)
+                hi += 1
+            while nearest and nearest[0] < lo:
+                nearest.popleft()
+
+            if metric == 'count':
+                value = hi - lo
             else:
-                dt_haz = ft.HazardFilter(operator.eq, haz)
-                if not dt_haz(approach):
-                    final_counter += 1
+                value = approaches[nearest[0]].distance if nearest else None
+            yield window_start, window_end, value
+            window_start += step
+
+    async def aquery(self, filters=(), batch_size=1000, executor=None):
+        """Query close approaches without blocking the running event loop.
+
+        This is the asynchronous counterpart of `query`. The scan runs in an
+        executor (by default, the event loop's default thread pool), one batch
+        at a time, and each batch of matching approaches is yielded back to the
+        event loop before the next is computed - so other coroutines keep
+        running while a broad query is scanning.
+
+        If the iteration is abandoned or cancelled, the scan is closed (and its
+        statistics are recorded) as soon as any batch still being computed in
+        the executor has finished.
+
+        :param filters: A collection of filters, as for `query`.
+        :param batch_size: The maximum number of `CloseApproach` objects in each batch.
+        :param executor: A `concurrent.futures.Executor` in which to run the scan, or None for the default.
+        :return: An asynchronous stream of non-empty lists of matching `CloseApproach` objects.
+        """
+        loop = asyncio.get_event_loop()
+        results = self.query(filters)
+        # Held while the scan is running in the executor, since a running generator can't be closed.
+        running = threading.Lock()
 
-            if final_counter == arg_counter:
-                yield approach
+        def take():
+            with running:
+                return _take(results, batch_size)
+
+        def close():
+            with running:
+                results.close()
+
+        try:
+            while True:
+                batch = await loop.run_in_executor(executor, take)
+                if not batch:
+                    return
+                yield batch
+        finally:
+            if running.acquire(blocking=False):
+                try:
+                    results.close()
+                finally:
+                    running.release()
             else:
-                continue
+                # A cancelled batch is still being computed, so close the scan after it in the executor.
+                loop.run_in_executor(executor, close)
+
+
+def _find_all(bitmap, flag):
+    """Generate the positions of every byte of a `bytearray` equal to `flag`, searching for each with `find`."""
+    n = bitmap.find(flag)
+    while n != -1:
+        yield n
+        n = bitmap.find(flag, n + 1)
+
 
-        return
+def _take(iterator, n):
+    """Return a list of the next (at most) `n` values from an iterator."""
+    return list(itertools.islice(iterator, n))
@@ -14,13 +14,11 @@ You'll edit this file in Task 2.
 """
 
 import csv
+import functools
 import json
 
 import models
-
-neo_list = list()
-closeApproach_list = list()
-pdes_name = dict()
+from helpers import sigma_to_minutes
 
 
 def load_neos(neo_csv_path):
@@ -29,59 +27,76 @@ def load_neos(neo_csv_path):
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
     :return: A collection of `NearEarthObject`s.
     """
+    neo_list = list()
     with open(neo_csv_path, 'r') as file:
         reader = csv.DictReader(file)
 
-        if not neo_list:
-            for row in reader:
-                name = dict(row).get('name')
+        for row in reader:
+            name = dict(row).get('name')
 
-                if not name:
-                    name = None
+            if not name:
+                name = None
 
-                pdes = dict(row).get('pdes')
+            pdes = dict(row).get('pdes')
 
-                if not pdes:
-                    pdes = "nan"
+            if not pdes:
+                pdes = "nan"
 
-                dia = dict(row).get('diameter')
-                if dia:
-                    dia = float(dia)
-                else:
-                    dia = float("nan")
+            dia = dict(row).get('diameter')
+            if dia:
+                dia = float(dia)
+            else:
+                dia = float("nan")
 
-                haz = dict(row).get('pha')
-                if haz == "Y":
-                    haz = True
-                else:
-                    haz = False
+            haz = dict(row).get('pha')
+            if haz == "Y":
+                haz = True
+            else:
+                haz = False
 
-                neoObjAttr = models.NearEarthObject(name=name, designation=pdes, diameter=dia, hazardous=haz)
-                neo_list.append(neoObjAttr)
-                pdes_name[pdes] = neoObjAttr
+            neoObjAttr = models.NearEarthObject(name=name, designation=pdes, diameter=dia, hazardous=haz)
+            neo_list.append(neoObjAttr)
 
-    file.close()
     return neo_list
 
 
+def _float(value):
+    """Convert an optional numeric field to a float, with NaN for a missing value."""
+    return float(value) if value else float('nan')
+
+
 def load_approaches(cad_json_path):
     """Read close approach data from a JSON file.
 
-    :param cad_json_path:
+    The approaches aren't linked to their NEOs yet - each only records its NEO's
+    primary designation, and the `NEODatabase` constructor links them up.
+
+    Fields are found by the names listed in the file's 'fields'. The distance
+    bounds, time uncertainty, velocity at infinity and magnitude are optional,
+    and are NaN when missing.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
     :return: A collection of `CloseApproach`es.
     """
-    if len(pdes_name) == 0:
-        c = load_neos(neo_csv_path)
-
+    closeApproach_list = list()
     with open(cad_json_path) as f:
         data = json.load(f)
-        if not closeApproach_list:
-            for val in data['data']:
-                neo_name = pdes_name[val[0]]
-                closeApproach_list.append(
-                    models.CloseApproach(designation=val[0], time=val[3], distance=float(val[4]),
-                                         velocity=float(val[7]),
-                                         neo=neo_name))
-
-    f.close()
+        fields = {name: n for n, name in enumerate(data['fields'])}
+        des, cd, dist, v_rel = fields['des'], fields['cd'], fields['dist'], fields['v_rel']
+        # Optional fields that the file lacks are read from an extra, always-missing column.
+        optional = ('dist_min', 'dist_max', 'v_inf', 't_sigma_f', 'h')
+        pad = not all(name in fields for name in optional)
+        dist_min, dist_max, v_inf, t_sigma_f, h = (fields.get(name, len(fields)) for name in optional)
+        # Time uncertainties take only a few hundred distinct values, so each is parsed once.
+        to_minutes = functools.lru_cache(maxsize=None)(sigma_to_minutes)
+        for val in data['data']:
+            if pad:
+                val = val + [None]
+            closeApproach_list.append(
+                models.CloseApproach(designation=val[des], time=val[cd], distance=float(val[dist]),
+                                     velocity=float(val[v_rel]),
+                                     distance_min=_float(val[dist_min]), distance_max=_float(val[dist_max]),
+                                     velocity_infinity=_float(val[v_inf]),
+                                     time_sigma=to_minutes(val[t_sigma_f]), magnitude=_float(val[h])))
+
     return closeApproach_list
@@ -17,6 +17,8 @@ iterator.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import heapq
+import operator
 
 
 class UnsupportedCriterionError(NotImplementedError):
@@ -38,8 +40,19 @@ class AttributeFilter:
 
     Concrete subclasses can override the `get` classmethod to provide custom
     behavior to fetch a desired attribute from the given `CloseApproach`.
+
+    A filter can also be evaluated on many close approaches at once, with
+    `mask`, which compares a whole column of `get` values to the reference
+    value. Subclasses can name the column (so that filters on the same
+    attribute share it), give it an `array` typecode, and `encode` values into
+    a more compact comparable form.
     """
 
+    # The name of the column of `get` values used by `mask` (None for the name of the class).
+    column = None
+    # The `array` typecode of the column, or None to store any objects.
+    typecode = None
+
     def __init__(self, op, value):
         """Construct a new `AttributeFilter` from an binary predicate and a reference value.
 
@@ -70,6 +83,26 @@ class AttributeFilter:
         """
         raise UnsupportedCriterionError
 
+    @classmethod
+    def encode(cls, value):
+        """Convert a value of the attribute of interest into the form stored in its column.
+
+        :param value: A value of the attribute, or a reference value to compare against it.
+        :return: An equivalent value that compares (via `self.op`) in the same way.
+        """
+        return value
+
+    def mask(self, columns):
+        """Evaluate this filter on every close approach of a `Columns` at once.
+
+        :param columns: A `Columns` of close approaches.
+        :return: A mask - a sequence of truth values, one per close approach.
+        """
+        # The column is keyed by `get` too, so that a subclass fetching something else doesn't share it.
+        name = (self.column or self.__class__.__name__, self.get.__func__)
+        values = columns.column(name, lambda approach: self.encode(self.get(approach)), self.typecode)
+        return columns.compare(self.op, values, self.encode(self.value))
+
     def __repr__(self):
         """Repr method for comparison of filter attributes."""
         return f"{self.__class__.__name__}(op=operator.{self.op.__name__}, value={self.value})"
@@ -78,6 +111,9 @@ class AttributeFilter:
 class DateFilter(AttributeFilter):
     """A date class for comparison of  dates."""
 
+    column = 'date'
+    typecode = 'l'
+
     def __init__(self, op, value):
         """Inheriting the superclass Attributefilter."""
         super().__init__(op, value)
@@ -92,10 +128,22 @@ class DateFilter(AttributeFilter):
         appr_date = approach.time.date()
         return appr_date
 
+    @classmethod
+    def encode(cls, value):
+        """Store dates as proleptic Gregorian ordinals, which compare in the same way.
+
+        :param value - a date.
+        :return - the date's ordinal.
+        """
+        return value.toordinal()
+
 
 class DistanceFilter(AttributeFilter):
     """A distance class for comparison of distance attribute of close approach."""
 
+    column = 'distance'
+    typecode = 'd'
+
     def __init__(self, op, value):
         """Inheriting the superclass Attributefilter."""
         super().__init__(op, value)
@@ -114,6 +162,9 @@ class DistanceFilter(AttributeFilter):
 class VelocityFilter(AttributeFilter):
     """A velocity class for comparison of velocity attribute of close approach."""
 
+    column = 'velocity'
+    typecode = 'd'
+
     def __init__(self, op, value):
         """Inheriting the superclass Attributefilter."""
         super().__init__(op, value)
@@ -132,6 +183,9 @@ class VelocityFilter(AttributeFilter):
 class DiameterFilter(AttributeFilter):
     """A Diameter class for comparison of diameter attribute of close approach."""
 
+    column = 'diameter'
+    typecode = 'd'
+
     def __init__(self, op, value):
         """Inheriting the superclass Attributefilter."""
         super().__init__(op, value)
@@ -150,6 +204,9 @@ class DiameterFilter(AttributeFilter):
 class HazardFilter(AttributeFilter):
     """A Hazard filter class for filtering the hazardous data of close approach."""
 
+    column = 'hazardous'
+    typecode = 'b'
+
     @classmethod
     def get(cls, approach):
         """Class method for getting the type of hazard for close approach.
@@ -161,11 +218,145 @@ class HazardFilter(AttributeFilter):
         return haz_neo.hazardous
 
 
+class IndexedFilter(AttributeFilter):
+    """A superclass for filters on a numeric attribute that can be looked up in a sorted index.
+
+    Rather than being evaluated on every close approach, a selective
+    `IndexedFilter` can gather the approaches it passes from a `SortedIndex`
+    of its column, with `candidates`.
+    """
+
+    typecode = 'd'
+
+    def candidates(self, snapshot):
+        """Gather the close approaches that pass this filter from a sorted index, if that is selective.
+
+        :param snapshot: A `Snapshot` of an `NEODatabase`.
+        :return: A list of the close approaches that pass this filter, or None to scan them instead.
+        """
+        if self.op not in (operator.le, operator.lt, operator.ge, operator.gt, operator.eq):
+            return None
+        return snapshot.candidates(self.column, self.get, self.op, self.value)
+
+
+class DistanceMinFilter(IndexedFilter):
+    """A distance class for comparison of the nearest (3-sigma) distance of close approach.
+
+    With `operator.le`, this selects the approaches that could possibly pass within a distance.
+    """
+
+    column = 'distance_min'
+
+    @classmethod
+    def get(cls, approach):
+        """Class method for getting the 3-sigma minimum distance of close approach.
+
+        :param approach: close approach object.
+        :return: approach minimum distance, in au.
+        """
+        return approach.distance_min
+
+
+class DistanceMaxFilter(IndexedFilter):
+    """A distance class for comparison of the farthest (3-sigma) distance of close approach.
+
+    With `operator.le`, this selects the approaches that certainly pass within a distance.
+    """
+
+    column = 'distance_max'
+
+    @classmethod
+    def get(cls, approach):
+        """Class method for getting the 3-sigma maximum distance of close approach.
+
+        :param approach: close approach object.
+        :return: approach maximum distance, in au.
+        """
+        return approach.distance_max
+
+
+class TimeSigmaFilter(AttributeFilter):
+    """A time uncertainty class for comparison of the 3-sigma uncertainty of the time of close approach."""
+
+    column = 'time_sigma'
+    typecode = 'd'
+
+    @classmethod
+    def get(cls, approach):
+        """Class method for getting the time uncertainty of close approach.
+
+        :param approach: close approach object.
+        :return: approach time uncertainty, in minutes.
+        """
+        return approach.time_sigma
+
+
+class MagnitudeFilter(AttributeFilter):
+    """A magnitude class for comparison of the absolute magnitude (H) of the NEO of close approach."""
+
+    column = 'magnitude'
+    typecode = 'd'
+
+    @classmethod
+    def get(cls, approach):
+        """Class method for getting the absolute magnitude of close approach.
+
+        :param approach: close approach object.
+        :return: approach absolute magnitude.
+        """
+        return approach.magnitude
+
+
+def is_in(value, collection):
+    """Return whether a value is in a collection - `operator.contains`, with its arguments reversed."""
+    return value in collection
+
+
+class DesignationFilter(AttributeFilter):
+    """A designation filter class for selecting the close approaches of a watchlist of NEOs.
+
+    The filter is constructed with `is_in` and a set of primary designations.
+    Rather than being evaluated on every close approach, it can gather just
+    the approaches of the listed NEOs, with `candidates`.
+    """
+
+    column = 'designation'
+
+    @classmethod
+    def get(cls, approach):
+        """Class method for getting the primary designation of the NEO of a close approach.
+
+        :param approach: close approach object.
+        :return: the NEO's primary designation.
+        """
+        return approach.designation
+
+    def candidates(self, snapshot):
+        """Gather the close approaches of the listed NEOs, looking each NEO up by its designation.
+
+        Each NEO's approaches are sorted by time in the snapshot's
+        `approaches_by_neo`, so they are merged by time without being sorted
+        again.
+
+        :param snapshot: A `Snapshot` of an `NEODatabase`.
+        :return: A list of the close approaches that can pass this filter.
+        """
+        neos = (snapshot.by_designation.get(designation) for designation in self.value)
+        return list(heapq.merge(*(snapshot.approaches_by_neo[neo] for neo in neos if neo is not None),
+                                key=operator.attrgetter('time')))
+
+    def __repr__(self):
+        """Repr method for comparison of filter attributes."""
+        return f"{self.__class__.__name__}(op={self.op.__name__}, value=<{len(self.value)} designations>)"
+
+
 def create_filters(date=None, start_date=None, end_date=None,
                    distance_min=None, distance_max=None,
                    velocity_min=None, velocity_max=None,
                    diameter_min=None, diameter_max=None,
-                   hazardous=None):
+                   hazardous=None, designations=None,
+                   dist_max_max=None, time_sigma_max=None, magnitude_max=None,
+                   dist_min_max=None):
     """Create a collection of filters from user-specified criteria.
 
     Each of these arguments is provided by the main module with a value from the
@@ -193,11 +384,46 @@ def create_filters(date=None, start_date=None, end_date=None,
     :param diameter_min: A minimum diameter of the NEO of a matching `CloseApproach`.
     :param diameter_max: A maximum diameter of the NEO of a matching `CloseApproach`.
     :param hazardous: Whether the NEO of a matching `CloseApproach` is potentially hazardous.
+    :param designations: A collection of primary designations, one of which is the NEO of a matching `CloseApproach`.
+    :param dist_max_max: A maximum 3-sigma maximum approach distance for a matching `CloseApproach`.
+    :param time_sigma_max: A maximum uncertainty, in minutes, of the time of a matching `CloseApproach`.
+    :param magnitude_max: A maximum absolute magnitude (H) of a matching `CloseApproach`.
+    :param dist_min_max: A maximum 3-sigma minimum approach distance for a matching `CloseApproach`.
     :return: A collection of filters for use with `query`.
     """
-    locals()
-
-    return locals()
+    filters = []
+    if date is not None:
+        filters.append(DateFilter(operator.eq, date))
+    if start_date is not None:
+        filters.append(DateFilter(operator.ge, start_date))
+    if end_date is not None:
+        filters.append(DateFilter(operator.le, end_date))
+    if distance_min is not None:
+        filters.append(DistanceFilter(operator.ge, distance_min))
+    if distance_max is not None:
+        filters.append(DistanceFilter(operator.le, distance_max))
+    if velocity_min is not None:
+        filters.append(VelocityFilter(operator.ge, velocity_min))
+    if velocity_max is not None:
+        filters.append(VelocityFilter(operator.le, velocity_max))
+    if diameter_min is not None:
+        filters.append(DiameterFilter(operator.ge, diameter_min))
+    if diameter_max is not None:
+        filters.append(DiameterFilter(operator.le, diameter_max))
+    if hazardous is not None:
+        filters.append(HazardFilter(operator.eq, hazardous))
+    if designations is not None:
+        filters.append(DesignationFilter(is_in, frozenset(designations)))
+    if dist_min_max is not None:
+        filters.append(DistanceMinFilter(operator.le, dist_min_max))
+    if dist_max_max is not None:
+        filters.append(DistanceMaxFilter(operator.le, dist_max_max))
+    if time_sigma_max is not None:
+        filters.append(TimeSigmaFilter(operator.le, time_sigma_max))
+    if magnitude_max is not None:
+        filters.append(MagnitudeFilter(operator.le, magnitude_max))
+
+    return filters
 
 
 def limit(iterator, n=10):
@@ -9,6 +9,9 @@ The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `sigma_to_minutes` function converts the uncertainty of an approach time,
+formatted as the `t_sigma_f` field of NASA's close approach data, into minutes.
 """
 
 from datetime import datetime
@@ -47,3 +50,24 @@ def datetime_to_str(dt):
     date_string = datetime.strftime(dt, "%Y-%m-%d %H:%M")
 
     return date_string
+
+
+def sigma_to_minutes(sigma):
+    """Convert a NASA-formatted time uncertainty into a number of minutes.
+
+    NASA's format, in the `t_sigma_f` field of close approach data, is either
+    hh:mm or d_hh:mm (with a number of days), or '< 00:01' for an uncertainty
+    of under a minute - which is read as its upper bound, 1 minute. For
+    example, 2 days, 3 hours and 4 minutes is:
+
+        2_03:04
+
+    :param sigma: A time uncertainty in [d_]hh:mm format, or None.
+    :return: The uncertainty in minutes, or NaN if unknown.
+    """
+    if not sigma:
+        return float('nan')
+    sigma = sigma.lstrip('< ')
+    days, _, clock = sigma.rpartition('_')
+    hours, minutes = clock.split(':')
+    return (int(days or 0) * 24 + int(hours)) * 60 + float(minutes)
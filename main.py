@@ -1,21 +1,32 @@
 """Main application of the programme."""
 import argparse
 import cmd
+import cProfile
 import datetime
+import io
+import json
+import os
 import pathlib
 import shlex
 import sys
+import threading
 import time
 
 
-from database import NEODatabase
+from database import DISTINCT_PICKS, ROLLING_METRICS, NEODatabase, QueryStats
 from extract import load_neos, load_approaches
 from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from helpers import datetime_to_str
+from server import ServerUnavailableError, forward, is_listening, serve
+from timing import PhaseTimer
+from write import (COMPRESSORS, NEO_WRITERS, STREAM_FORMATS, WRITERS, stream_timeline_csv, write_groups_to_csv,
+                   write_partitioned, write_pipelined, write_timeline_to_csv, write_to_stream, writer_for)
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
+# The default socket on which the `serve` subcommand listens.
+SOCKET_PATH = PROJECT_ROOT / '.neo.sock'
 
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
@@ -36,37 +47,13 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
-def make_parser():
-    """Create an ArgumentParser for this script.
+def add_filter_arguments(parser):
+    """Add the options that construct filters with `create_filters` to a subcommand's parser.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :param parser: The parser of a subcommand, such as `query`.
     """
-    parser = argparse.ArgumentParser(
-        description="Explore past and future close approaches of near-Earth objects."
-    )
-
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
-
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                    description="Inspect an NEO by primary designation or by name.")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                         help="Additionally, print all known close approaches of this NEO.")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes', help="The primary designation of the NEO to inspect (e.g. '433').")
-    inspect_id.add_argument('-n', '--name', help="The IAU name of the NEO to inspect (e.g. 'Halley').")
-
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query', description="Query for close approaches that match a collection of filters.")
-    filters = query.add_argument_group('Filters', description="Filter close approaches by their attributes "
-                                                              "or the attributes of their NEOs.")
+    filters = parser.add_argument_group('Filters', description="Filter close approaches by their attributes "
+                                                               "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
                          help="Only return close approaches on the given date, "
                               "in YYYY-MM-DD format (e.g. 2020-12-31).")
@@ -102,38 +89,239 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
+    filters.add_argument('--possibly-within', '--max-dist-min', dest='dist_min_max', type=float,
+                         help="In astronomical units. Only return close approaches whose 3-sigma "
+                              "minimum distance is as near or nearer to Earth as the given distance - "
+                              "that is, approaches that could possibly pass within it.")
+    filters.add_argument('--certainly-within', '--max-dist-max', dest='dist_max_max', type=float,
+                         help="In astronomical units. Only return close approaches whose 3-sigma "
+                              "maximum distance is as near or nearer to Earth as the given distance - "
+                              "that is, approaches that certainly pass within it.")
+    filters.add_argument('--max-time-sigma', dest='time_sigma_max', type=float,
+                         help="In minutes. Only return close approaches whose time is known to within "
+                              "the given 3-sigma uncertainty.")
+    filters.add_argument('--max-h', dest='magnitude_max', type=float,
+                         help="Only return close approaches of NEOs with an absolute magnitude (H) as "
+                              "small or smaller than the given magnitude - that is, as bright or brighter.")
+    filters.add_argument('--pdes-file', type=pathlib.Path,
+                         help="Only return close approaches of the NEOs whose primary designations are "
+                              "listed in the given file, one per line (blank lines and lines "
+                              "starting with # are ignored).")
+
+
+def datetime_fromisoformat(datetime_string):
+    """Return a `datetime.datetime` corresponding to a string in YYYY-MM-DDThh:mm format.
+
+    The time may also be separated from the date by a space, or be left out
+    entirely (for midnight).
+
+    :param datetime_string: A date and time in the format YYYY-MM-DDThh:mm.
+    :return: A naive `datetime.datetime` corresponding to the given string.
+    """
+    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(datetime_string, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"'{datetime_string}' is not a valid date and time. Use YYYY-MM-DDThh:mm.")
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: A tuple of the top-level, inspect, and query parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="Explore past and future close approaches of near-Earth objects."
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--socket', default=SOCKET_PATH, type=pathlib.Path,
+                        help="Path to the Unix domain socket of a `serve` process. If a server is "
+                             "listening there, `inspect` and `query` are forwarded to it.")
+    parser.add_argument('--no-server', action='store_true',
+                        help="Always load the data files, even if a server is running.")
+    parser.add_argument('--timings', action='store_true',
+                        help="Report the wall time and peak memory of each phase of the run to stderr.")
+    parser.add_argument('--profile', type=pathlib.Path,
+                        help="Save a cProfile profile of the run to the given file (e.g. out.prof).")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                    description="Inspect an NEO by primary designation or by name.")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                         help="Additionally, print all known close approaches of this NEO.")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes', help="The primary designation of the NEO to inspect (e.g. '433').")
+    inspect_id.add_argument('-n', '--name', help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+    inspect_id.add_argument('--prefix', help="List the NEOs whose primary designation or name starts with this "
+                                             "prefix, ignoring case (e.g. 'hal').")
+    inspect_range = inspect.add_argument_group('Close approaches', description="With --verbose, print only "
+                                               "some of the close approaches, in order of time.")
+    inspect_range.add_argument('--start-date', type=date_fromisoformat,
+                               help="Print only close approaches on or after the given date (in YYYY-MM-DD format).")
+    inspect_range.add_argument('--end-date', type=date_fromisoformat,
+                               help="Print only close approaches on or before the given date (in YYYY-MM-DD format).")
+    inspect_range.add_argument('--limit', type=int,
+                               help="Print at most this many close approaches (the earliest ones).")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query', description="Query for close approaches that match a collection of filters.")
+    add_filter_arguments(query)
+    near = query.add_argument_group('Nearest in time', description="Find the close approaches nearest in "
+                                                                   "time to a moment, before or after it.")
+    near.add_argument('--near', type=datetime_fromisoformat,
+                      help="Return the matching close approaches nearest in time to the given moment, "
+                           "in YYYY-MM-DDThh:mm format (e.g. 2029-04-13T21:46), in order of time.")
+    near.add_argument('--k', type=int, default=10,
+                      help="With --near, the number of close approaches to return. Defaults to 10.")
+    distinct = query.add_argument_group('Distinct NEOs', description="Return at most one close approach "
+                                                                     "per NEO, in order of time.")
+    distinct.add_argument('--distinct-neo', action='store_true',
+                          help="Return only one matching close approach of each NEO.")
+    distinct.add_argument('--pick', choices=tuple(DISTINCT_PICKS), default='first',
+                          help="With --distinct-neo, which matching close approach of each NEO to return: "
+                               "its first, its closest to Earth or its fastest. Defaults to first.")
     query.add_argument('-l', '--limit', type=int,
-                       help="The maximum number of matches to return. "
+                       help="The maximum number of matches to return, or 0 for all of them "
+                            "(e.g. to pipe --format csv to another tool). "
                             "Defaults to 10 if no --outfile is given.")
-    query.add_argument('-o', '--outfile', type=pathlib.Path,
-                       help="File in which to save structured results. "
-                            "If omitted, results are printed to standard output.")
+    outfiles = query.add_mutually_exclusive_group()
+    outfiles.add_argument('-o', '--outfile', type=pathlib.Path,
+                          help="File in which to save structured results, as .csv, .json or "
+                               ".ndjson/.jsonl (one record per line), optionally compressed "
+                               "with a suffix such as .gz. "
+                               "If omitted, results are printed to standard output.")
+    outfiles.add_argument('--outfile-pattern',
+                          help="Save structured results to one file per partition, named by "
+                               "a pattern using {year} and/or {designation} "
+                               "(e.g. 'out/{year}.csv'). Partitions are written in parallel.")
+    query.add_argument('-f', '--format', choices=tuple(STREAM_FORMATS), default='text',
+                       help="The format of results printed to standard output. Defaults to text.")
+    query.add_argument('--workers', type=int,
+                       help="The number of processes writing --outfile-pattern partitions. "
+                            "Defaults to the number of CPUs.")
+    query.add_argument('--pipeline', action='store_true',
+                       help="Write the --outfile from a background thread, overlapping "
+                            "formatting and file I/O with the query scan.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
+
+    batch = subparsers.add_parser('batch',
+                                  description="Run many queries in a single pass over the close approaches.")
+    batch.add_argument('-q', '--queries', type=pathlib.Path, required=True,
+                       help="Path to a file with one query per line, as a JSON object mapping "
+                            "`create_filters` arguments (dates in YYYY-MM-DD format) to values, "
+                            "plus an optional 'limit' and 'outfile' "
+                            "(e.g. {\"start_date\": \"2020-01-01\", \"hazardous\": true, \"outfile\": \"haz.csv\"}).")
+
+    coincident = subparsers.add_parser('coincident',
+                                       description="Find groups of close approaches by distinct NEOs that "
+                                                   "happen within a time window of each other.")
+    coincident.add_argument('-w', '--window', type=float, default=60.0,
+                            help="In minutes. The most time that can pass between the first and last "
+                                 "approaches in a group. Defaults to 60. "
+                                 "Use --max-distance to also require each approach to be close.")
+    add_filter_arguments(coincident)
+    coincident.add_argument('-l', '--limit', type=int,
+                            help="The maximum number of groups to return. "
+                                 "Defaults to 10 if no --outfile is given.")
+    coincident.add_argument('-o', '--outfile', type=pathlib.Path,
+                            help="CSV file in which to save the groups, one row per close approach, "
+                                 "optionally compressed with a suffix such as .gz.")
+
+    timeline = subparsers.add_parser('timeline',
+                                     description="Count (or find the nearest of) the close approaches that match "
+                                                 "a collection of filters in each window of a sliding time window, "
+                                                 "as CSV.")
+    timeline.add_argument('--window-days', type=float, default=30.0,
+                          help="The length of each window, in days. Defaults to 30.")
+    timeline.add_argument('--step-days', type=float,
+                          help="The number of days between the starts of consecutive windows. "
+                               "Defaults to --window-days, for windows that don't overlap.")
+    timeline.add_argument('-m', '--metric', choices=ROLLING_METRICS, default='count',
+                          help="What to compute for each window: the number of matching close approaches "
+                               "or their nearest distance, in au. Defaults to count.")
+    add_filter_arguments(timeline)
+    timeline.add_argument('-o', '--outfile', type=pathlib.Path,
+                          help="CSV file in which to save the windows, optionally compressed with a suffix "
+                               "such as .gz. If omitted, the CSV is printed to standard output.")
+
+    neos = subparsers.add_parser('neos', description="Query for NEOs (rather than their close approaches) "
+                                                     "by diameter and hazard. Only the NEO file is loaded.")
+    neos.add_argument('--min-diameter', dest='diameter_min', type=float,
+                      help="In kilometers. Only return NEOs with diameters as large or larger than the given size.")
+    neos.add_argument('--max-diameter', dest='diameter_max', type=float,
+                      help="In kilometers. Only return NEOs with diameters as small or smaller than the given size.")
+    neos.add_argument('--hazardous', dest='hazardous', default=None, action='store_true',
+                      help="If specified, only return NEOs that are potentially hazardous.")
+    neos.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
+                      help="If specified, only return NEOs that are not potentially hazardous.")
+    neos.add_argument('-l', '--limit', type=int,
+                      help="The maximum number of NEOs to return. Defaults to 10 if no --outfile is given.")
+    neos.add_argument('-o', '--outfile', type=pathlib.Path,
+                      help=f"File in which to save the NEOs, ending with one of {', '.join(NEO_WRITERS)} "
+                           f"and optionally compressed with a suffix such as .gz.")
+
+    subparsers.add_parser('serve',
+                          description="Load the data files once, and answer `inspect` and `query` "
+                                      "commands forwarded by other invocations over --socket.")
     return parser, inspect, query
 
 
-def inspect(database, pdes=None, name=None, verbose=False):
+def inspect(database, pdes=None, name=None, verbose=False, stdout=None, stderr=None, prefix=None,
+            start_date=None, end_date=None, approach_limit=None, approaches_loaded=True):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO is
-    found, information about the NEO is printed (additionally, information for
-    all of the NEO's known close approaches is printed if `verbose=True`).
-    Otherwise, a message is printed noting that there are no matching NEOs.
+    found, information about the NEO and a summary of its close approaches are
+    printed (additionally, information for the NEO's known close approaches is
+    printed if `verbose=True`). Otherwise, a message is printed noting that
+    there are no matching NEOs.
 
-    At least one of `pdes` and `name` must be given. If both are given, prefer
-    to look up the NEO by the primary designation.
+    At least one of `pdes`, `name` and `prefix` must be given. If both `pdes`
+    and `name` are given, prefer to look up the NEO by the primary designation.
+    If `prefix` is given instead, every NEO whose designation or name starts
+    with it is printed.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
-    :param verbose: Whether to additionally print all of a matching NEO's close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :param verbose: Whether to additionally print a matching NEO's close approaches.
+    :param stdout: A text stream for results. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param prefix: The start of the primary designations or names of NEOs for which to search.
+    :param start_date: With `verbose`, print only close approaches on or after this `date`.
+    :param end_date: With `verbose`, print only close approaches on or before this `date`.
+    :param approach_limit: With `verbose`, print at most this many close approaches of each NEO.
+    :param approaches_loaded: Whether `database` has its close approaches yet. If not, the summary is left out.
+    :return: The matching `NearEarthObject`, or None if not found (or, with `prefix`, a list of them).
     """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    if prefix is not None and not (pdes or name):
+        neos = database.get_neos_by_prefix(prefix)
+        if not neos:
+            print("No matching NEOs exist in the database.", file=stderr)
+        for neo in neos:
+            print(neo, file=stdout)
+            if verbose:
+                for approach in database.approaches_of(neo, start_date, end_date, approach_limit):
+                    print(approach, file=stdout)
+        return neos
+
     # Fetch the NEO of interest.
     if pdes:
         neo = database.get_neo_by_designation(pdes)
@@ -142,51 +330,464 @@ def inspect(database, pdes=None, name=None, verbose=False):
 
     # Ensure that we have received an NEO.
     if not neo:
-        print("No matching NEOs exist in the database.", file=sys.stderr)
+        print("No matching NEOs exist in the database.", file=stderr)
         return None
 
-    # Display information about this NEO, and optionally its close approaches if verbose.
-    print(neo.__str__())
+    # Display information about this NEO and a summary of its close approaches.
+    print(neo.__str__(), file=stdout)
+    if not approaches_loaded:
+        print("(close approaches still loading)", file=stdout)
+        return neo
+    summary = database.summary(neo)
+    print(f"Known close approaches: {summary.count}", file=stdout)
+    if summary.closest is not None:
+        closest = summary.closest
+        print(f"Closest approach: on {closest.time_str} at {closest.distance:.4f} au", file=stdout)
+    if summary.next_approach is not None:
+        upcoming = summary.next_approach
+        print(f"Next approach: on {upcoming.time_str} at {upcoming.distance:.4f} au", file=stdout)
+    else:
+        print(f"Next approach: none known after {datetime_to_str(summary.as_of)}", file=stdout)
 
+    # Optionally, display (some of) its close approaches too.
     if verbose:
-        for approach in neo.approaches:
-            print(approach.__str__())
+        for approach in database.approaches_of(neo, start_date, end_date, approach_limit):
+            print(approach.__str__(), file=stdout)
 
     return neo
 
 
-def query(database, args):
-    """Perform the `query` subcommand.
+def load_designations(path):
+    """Read a watchlist of primary designations from a file with one per line.
+
+    Surrounding whitespace, blank lines and lines starting with '#' are ignored.
+
+    :param path: A path to the file of designations.
+    :return: A list of primary designations.
+    """
+    with open(path) as infile:
+        return [line.strip() for line in infile if line.strip() and not line.lstrip().startswith('#')]
+
+
+def filters_from_args(args):
+    """Construct a collection of filters from the arguments of the `query` subcommand.
 
-    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A collection of filters for use with `NEODatabase.query`.
+    :raises OSError: If the --pdes-file can't be read.
     """
-    # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
+    return create_filters(
         date=args.date, start_date=args.start_date, end_date=args.end_date,
         distance_min=args.distance_min, distance_max=args.distance_max,
         velocity_min=args.velocity_min, velocity_max=args.velocity_max,
         diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
+        hazardous=args.hazardous,
+        designations=load_designations(args.pdes_file) if args.pdes_file else None,
+        dist_min_max=args.dist_min_max, dist_max_max=args.dist_max_max,
+        time_sigma_max=args.time_sigma_max, magnitude_max=args.magnitude_max
     )
 
-    results = database.query(filters)
 
-    if not args.outfile:
-        # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            try:
-                print(result)
-            except StopIteration:
-                break
+def query(database, args, stdout=None, stderr=None, timer=None):
+    """Perform the `query` subcommand.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for results without an --outfile. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param timer: A `PhaseTimer` in which to record the phases of the query, or None.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    timer = timer or PhaseTimer(enabled=False)
+
+    # Construct a collection of filters from arguments supplied at the command line.
+    with timer.phase('filter construction'):
+        try:
+            filters = filters_from_args(args)
+        except OSError as err:
+            print(f"Unable to read the list of designations: {err}", file=stderr)
+            return
+
+    if args.near is not None and args.distinct_neo:
+        print("--distinct-neo can't be combined with --near.", file=stderr)
+        return
+    if args.near is not None:
+        # The nearest approaches are already limited, to --k of them.
+        results = timer.timed('query scan', database.nearest(args.near, args.k, filters))
+        args = argparse.Namespace(**{**vars(args), 'limit': args.k})
+    elif args.distinct_neo:
+        results = timer.timed('query scan', database.query_distinct(filters, args.pick))
     else:
-        # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+        results = timer.timed('query scan', database.query(filters))
+    with timer.phase('output write', excluding=('query scan',)):
+        write_query_results(results, args, stdout, stderr)
+
+
+def write_query_results(results, args, stdout, stderr):
+    """Write the results of the `query` subcommand where its arguments ask for them.
+
+    :param results: A stream of matching `CloseApproach` objects.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for results without an --outfile.
+    :param stderr: A text stream for error messages.
+    """
+    if args.outfile_pattern:
+        # Write the results to one file per partition.
+        try:
+            write_partitioned(limit(results, args.limit), args.outfile_pattern, workers=args.workers)
+        except ValueError as err:
+            print(err, file=stderr)
+    elif not args.outfile:
+        # Write the results to stdout, limiting to 10 entries if not specified (and not at all with --limit 0).
+        write_to_stream(limit(results, 10 if args.limit is None else args.limit), stdout, args.format)
+    else:
+        # Write the results to a file, in the format chosen by its extension.
+        writer = writer_for(args.outfile)
+        if writer and args.pipeline:
+            write_pipelined(limit(results, args.limit), args.outfile, writer=writer)
+        elif writer:
+            writer(limit(results, args.limit), args.outfile)
+        else:
+            print(f"Please use an output file that ends with one of {', '.join(WRITERS)}, "
+                  f"optionally followed by one of {', '.join(COMPRESSORS)}.", file=stderr)
+
+
+def explain(database, args, stdout=None):
+    """Run a query for its statistics, and print how each of its filters performed.
+
+    All matching close approaches are counted (ignoring any --limit or
+    --outfile), and the rows each filter was evaluated on and rejected are
+    printed, in the order the filters were evaluated, alongside the pass rate
+    of each type of filter over every query so far.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for the explanation. Defaults to `sys.stdout`.
+    """
+    stdout = stdout or sys.stdout
+    try:
+        filters = filters_from_args(args)
+    except OSError as err:
+        print(f"Unable to read the list of designations: {err}", file=sys.stderr)
+        return
+    # The query's own counters, rather than `last_stats`, which another thread's query may replace.
+    stats = QueryStats()
+    for _ in database.query(filters, stats):
+        pass
+    # The query evaluated its filters (and so counted them) in this order.
+    order = list(stats.evaluated)
+    overall = database.stats_copy()
+
+    print(f"Scanned {stats.scanned} close approaches in {stats.seconds:.3f} s and matched {stats.yielded}.",
+          file=stdout)
+    if order:
+        print(f"{'Filter':<24}{'Evaluated':>10}{'Rejected':>10}{'Pass rate':>11}{'Overall':>9}", file=stdout)
+    for key in order:
+        evaluated, rejected = stats.evaluated[key], stats.rejected[key]
+        rate = f"{stats.pass_rate(key):.1%}" if evaluated else '-'
+        print(f"{key:<24}{evaluated:>10}{rejected:>10}{rate:>11}{overall.pass_rate(key):>9.1%}", file=stdout)
+
+
+def coincident(database, args, stdout=None, stderr=None, timer=None):
+    """Perform the `coincident` subcommand.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for results without an --outfile. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param timer: A `PhaseTimer` in which to record the phases of the search, or None.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    timer = timer or PhaseTimer(enabled=False)
+
+    with timer.phase('filter construction'):
+        try:
+            filters = filters_from_args(args)
+        except OSError as err:
+            print(f"Unable to read the list of designations: {err}", file=stderr)
+            return
+
+    window = datetime.timedelta(minutes=args.window)
+    groups = timer.timed('query scan', database.coincident(window, filters))
+    with timer.phase('output write', excluding=('query scan',)):
+        if args.outfile:
+            write_groups_to_csv(limit(groups, args.limit), args.outfile)
+            return
+        for group in limit(groups, args.limit or 10):
+            span = (group[-1].time - group[0].time).total_seconds() / 60
+            print(f"{len(group)} close approaches by {len({approach.neo for approach in group})} NEOs "
+                  f"within {span:.0f} minutes:", file=stdout)
+            for approach in group:
+                print(f"  {approach}", file=stdout)
+
+
+def timeline(database, args, stdout=None, stderr=None, timer=None):
+    """Perform the `timeline` subcommand.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for the CSV without an --outfile. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param timer: A `PhaseTimer` in which to record the phases of the aggregation, or None.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    timer = timer or PhaseTimer(enabled=False)
+
+    with timer.phase('filter construction'):
+        try:
+            filters = filters_from_args(args)
+            rows = database.rolling(filters, args.window_days, args.step_days, args.metric,
+                                    start=args.date or args.start_date)
+        except (OSError, ValueError) as err:
+            print(err, file=stderr)
+            return
+
+    rows = timer.timed('query scan', rows)
+    with timer.phase('output write', excluding=('query scan',)):
+        if args.outfile:
+            write_timeline_to_csv(rows, args.outfile, args.metric)
         else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+            stream_timeline_csv(rows, stdout, args.metric)
+
+
+def query_neos(database, args, stdout=None, stderr=None, timer=None):
+    """Perform the `neos` subcommand.
+
+    :param database: The `NEODatabase` containing data on NEOs.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for results without an --outfile. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param timer: A `PhaseTimer` in which to record the phases of the query, or None.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    timer = timer or PhaseTimer(enabled=False)
+
+    neos = timer.timed('query scan', database.query_neos(args.diameter_min, args.diameter_max, args.hazardous))
+    with timer.phase('output write', excluding=('query scan',)):
+        if not args.outfile:
+            for neo in limit(neos, args.limit or 10):
+                print(neo, file=stdout)
+            return
+        writer = writer_for(args.outfile, NEO_WRITERS)
+        if writer:
+            writer(limit(neos, args.limit), args.outfile)
+        else:
+            print(f"Please use an output file that ends with one of {', '.join(NEO_WRITERS)}, "
+                  f"optionally followed by one of {', '.join(COMPRESSORS)}.", file=stderr)
+
+
+def load_batch(path):
+    """Read a batch of queries from a file with one JSON object per line.
+
+    Each object maps the arguments of `create_filters` to their values, with
+    dates in YYYY-MM-DD format, and may also give a 'limit' on the number of
+    results and an 'outfile' in which to save them. Blank lines are ignored.
+
+    :param path: A path to the file of queries.
+    :return: A list of `(filters, limit, outfile)` tuples, one per query.
+    :raises ValueError: If a query is malformed.
+    """
+    queries = []
+    with open(path) as infile:
+        for lineno, line in enumerate(infile, start=1):
+            if not line.strip():
+                continue
+            try:
+                criteria = json.loads(line)
+                limit_ = criteria.pop('limit', None)
+                outfile = criteria.pop('outfile', None)
+                for key in ('date', 'start_date', 'end_date'):
+                    if criteria.get(key) is not None:
+                        criteria[key] = date_fromisoformat(criteria[key])
+                filters = create_filters(**criteria)
+            except (ValueError, TypeError, AttributeError, argparse.ArgumentTypeError) as err:
+                raise ValueError(f"{path}:{lineno}: invalid query: {err}") from err
+            if outfile and not writer_for(outfile):
+                raise ValueError(f"{path}:{lineno}: unsupported output file: {outfile}")
+            queries.append((filters, limit_, outfile and pathlib.Path(outfile)))
+    return queries
+
+
+def batch(database, args, stdout=None, stderr=None, timer=None):
+    """Perform the `batch` subcommand.
+
+    Every query in the batch is answered from one shared scan of the close
+    approaches. Queries with an 'outfile' are saved to it; the results of the
+    others are printed to standard output (limited to 10 entries if the query
+    doesn't give a limit, and not at all if its limit is 0), each under a header line.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param stdout: A text stream for results without an outfile. Defaults to `sys.stdout`.
+    :param stderr: A text stream for error messages. Defaults to `sys.stderr`.
+    :param timer: A `PhaseTimer` in which to record the phases of the batch, or None.
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    timer = timer or PhaseTimer(enabled=False)
+
+    try:
+        with timer.phase('filter construction'):
+            queries = load_batch(args.queries)
+    except (OSError, ValueError) as err:
+        print(err, file=stderr)
+        return
+
+    limits = [limit_ if outfile or limit_ is not None else 10 for _, limit_, outfile in queries]
+    with timer.phase('query scan'):
+        results = database.query_many([filters for filters, _, _ in queries], limits)
+
+    with timer.phase('output write'):
+        for n, ((_, _, outfile), matches) in enumerate(zip(queries, results), start=1):
+            if outfile:
+                writer_for(outfile)(matches, outfile)
+            else:
+                print(f"# Query {n}: {len(matches)} result(s)", file=stdout)
+                write_to_stream(matches, stdout)
+
+
+def file_signature(path):
+    """Return a cheap fingerprint of a file's contents - its modification time and size.
+
+    :param path: The path of a file.
+    :return: A tuple of the file's modification time (in nanoseconds) and size, or None if it can't be read.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class BackgroundLoader:
+    """Load the data files into an `NEODatabase` on a background thread.
+
+    The NEOs are loaded first, and made available as soon as they are parsed
+    (in a database without any close approaches); the close approaches are
+    then loaded and linked in with `NEODatabase.refresh`. Callers can wait for
+    just the part of the data that they need.
+
+    Once loaded, the data files can be watched with `check`, which compares
+    their signatures with those from when they were loaded and, on a change,
+    reloads them on another background thread. The old data stays in use until
+    the new data is swapped in. If only the close approach file has changed,
+    only the approaches that were added or removed are applied.
+    """
+
+    def __init__(self, neofile, cadfile, timer=None):
+        """Start loading the data files.
+
+        :param neofile: A path to the CSV file of near-Earth objects.
+        :param cadfile: A path to the JSON file of close approach data.
+        :param timer: A `PhaseTimer` in which to record the phases of loading, or None.
+        """
+        self.neofile = neofile
+        self.cadfile = cadfile
+        self.timer = timer or PhaseTimer(enabled=False)
+        self.database = None
+        self.error = None
+        self.message = None
+        self.status = 'loading NEOs'
+        self.started = time.time()
+        self.signatures = self._signatures()
+        self.neos_ready = threading.Event()
+        self.approaches_ready = threading.Event()
+        self.thread = threading.Thread(target=self._load, name='neo-loader', daemon=True)
+        self.thread.start()
+
+    def _signatures(self):
+        return file_signature(self.neofile), file_signature(self.cadfile)
+
+    def _load(self):
+        try:
+            with self.timer.phase('CSV parse'):
+                neos = load_neos(self.neofile)
+            self.database = NEODatabase(neos, [])
+            self.status = 'loading close approaches'
+            self.neos_ready.set()
+
+            with self.timer.phase('JSON parse'):
+                approaches = load_approaches(self.cadfile)
+            with self.timer.phase('database linking'):
+                self.database.refresh(neos, approaches)
+            self.status = 'ready'
+        except Exception as err:
+            self.error = err
+            self.status = 'failed'
+        finally:
+            self.neos_ready.set()
+            self.approaches_ready.set()
+
+    def _reload(self, neos_changed):
+        try:
+            if neos_changed:
+                # The NEOs may have been renamed or removed, so relink everything from scratch.
+                with self.timer.phase('CSV parse'):
+                    neos = load_neos(self.neofile)
+                with self.timer.phase('JSON parse'):
+                    approaches = load_approaches(self.cadfile)
+                with self.timer.phase('database linking'):
+                    self.database.refresh(neos, approaches)
+                self.message = (f"Reloaded {len(self.database.listneo)} NEOs and "
+                                f"{len(self.database.listapproach)} close approaches.")
+            else:
+                with self.timer.phase('JSON parse'):
+                    approaches = load_approaches(self.cadfile)
+                with self.timer.phase('database linking'):
+                    added, removed = self.database.diff(approaches)
+                    if added or removed:
+                        self.database.apply(added, removed)
+                self.message = f"Reloaded close approaches: {len(added)} added and {len(removed)} removed."
+        except Exception as err:
+            self.message = f"Unable to reload the data, so the previous data is still in use: {err}"
+        finally:
+            self.status = 'ready'
+
+    @property
+    def ready(self):
+        """Return whether loading has finished (successfully or not)."""
+        return self.approaches_ready.is_set()
+
+    @property
+    def busy(self):
+        """Return whether the data files are being loaded or reloaded."""
+        return self.status not in ('ready', 'failed')
+
+    def wait(self, approaches=True):
+        """Wait until the requested part of the data has been loaded.
+
+        :param approaches: Whether to wait for the close approaches, or just for the NEOs.
+        :return: The `NEODatabase`, or None if loading failed.
+        """
+        (self.approaches_ready if approaches else self.neos_ready).wait()
+        if self.error is not None and (approaches or self.database is None):
+            return None
+        return self.database
+
+    def check(self):
+        """Start reloading the data files in the background if either has changed since it was loaded.
+
+        Nothing is checked while the data is still being loaded or reloaded.
+
+        :return: A list of the paths of the changed files, which is empty if nothing is being reloaded.
+        """
+        if self.busy or self.database is None:
+            return []
+        signatures = self._signatures()
+        changed = [path for path, old, new in zip((self.neofile, self.cadfile), self.signatures, signatures)
+                   if old != new]
+        if changed:
+            self.signatures = signatures
+            self.status = 'reloading'
+            self.started = time.time()
+            self.thread = threading.Thread(target=self._reload, args=(self.neofile in changed,),
+                                           name='neo-reloader', daemon=True)
+            self.thread.start()
+        return changed
 
 
 class NEOShell(cmd.Cmd):
@@ -204,22 +805,65 @@ class NEOShell(cmd.Cmd):
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    def __init__(self, database, inspect_parser, query_parser, aggressive=False, timings=False, loader=None,
+                 **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
 
-        :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+        The data can either be supplied already loaded, as `database`, or be
+        loading in the background, with a `loader` - in which case the session
+        starts immediately and each command waits only for the part of the data
+        that it needs.
+
+        :param database: The `NEODatabase` containing data on NEOs and their close approaches, or None.
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param timings: Whether to report the phases of each command, as with `timings on`.
+        :param loader: A `BackgroundLoader` loading the data, or None if `database` is given.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
         self.db = database
+        self.loader = loader
         self.inspect = inspect_parser
         self.query = query_parser
         self.aggressive = aggressive
+        self.timings = timings
+        # The project's files are listed once; each command checks only their modification times.
+        self.project_files = list(PROJECT_ROOT.glob('*.py'))
+        self.update_prompt()
+
+    def update_prompt(self):
+        """Show the progress of a background load in the prompt."""
+        if self.loader is None or not self.loader.busy:
+            if self.loader is not None and self.loader.timer.seconds:
+                # Loading has finished, so report (once) how long it took, if asked.
+                self.loader.timer.report()
+                self.loader.timer.reset()
+            self.prompt = type(self).prompt
+        else:
+            elapsed = time.time() - self.loader.started
+            self.prompt = f'(neo: {self.loader.status}, {elapsed:.0f}s) '
+
+    def database(self, approaches=True):
+        """Return the database, waiting for the data that a command needs to finish loading.
+
+        :param approaches: Whether the command needs the close approaches, or just the NEOs.
+        :return: The `NEODatabase`, or None if loading failed.
+        """
+        if self.loader is None:
+            return self.db
+
+        needed = self.loader.approaches_ready if approaches else self.loader.neos_ready
+        if not needed.is_set():
+            print(f"Waiting for the data to finish loading ({self.loader.status})...", file=sys.stderr)
+        self.db = self.loader.wait(approaches)
+        self.update_prompt()
+        if self.db is None:
+            print(f"Unable to load the data: {self.loader.error}", file=sys.stderr)
+        return self.db
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -263,15 +907,55 @@ class NEOShell(cmd.Cmd):
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
+
+        Or just those in a range of dates:
+
+            (neo) inspect --verbose --name Eros --start-date 2020-01-01 --end-date 2049-12-31 --limit 5
+
+        List the NEOs whose designation or name starts with a prefix:
+
+            (neo) inspect --prefix hal
+
+        Press Tab after `--pdes` or `--name` to complete a designation or name.
         """
         args = self.parse_arg_with(arg, self.inspect)
         if not args:
             return
 
+        database = self.database(approaches=args.verbose)
+        if database is None:
+            return
+        # Without --verbose, inspect the NEO as soon as the NEOs are loaded, and summarize it once its approaches are.
+        loaded = self.loader is None or (self.loader.approaches_ready.is_set() and self.loader.error is None)
+
         # Run the `inspect` subcommand.
-        inspect(self.db,
-                pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+        timer = PhaseTimer(enabled=self.timings)
+        with timer.phase('inspect'):
+            inspect(database,
+                    pdes=args.pdes, name=args.name, prefix=args.prefix,
+                    verbose=args.verbose, start_date=args.start_date, end_date=args.end_date,
+                    approach_limit=args.limit, approaches_loaded=loaded)
+        timer.report()
+
+    def complete_inspect(self, text, line, begidx, endidx):
+        """Complete the options of `inspect`, and the designations and names of NEOs after them."""
+        if text.startswith('-'):
+            return [flag for flag in self.inspect._option_string_actions if flag.startswith(text)]
+
+        options = [word for word in line[:begidx].split()[1:] if word.startswith('-')]
+        option = options[-1] if options else None
+        if option in ('-p', '--pdes', '-n', '--name', '--prefix'):
+            if self.loader is not None and not self.loader.neos_ready.is_set():
+                return []
+            database = self.database(approaches=False)
+            if database is None:
+                return []
+            # Designations and names can contain spaces, which end `text`, so
+            # complete everything typed after the option and drop what came before `text`.
+            typed = line[line.rindex(option, 0, begidx) + len(option):endidx].lstrip()
+            field = 'name' if option in ('-n', '--name') else 'designation'
+            return [match[len(typed) - len(text):] for match in database.complete(typed, field)]
+        return []
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -298,13 +982,58 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+            (neo) query --limit 5 --outfile results.ndjson.gz
+
+        Or split across one file per year (or per NEO, with `{designation}`):
+
+            (neo) query --outfile-pattern 'out/{year}.csv'
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
             return
 
-        # Run the `inspect` subcommand.
-        query(self.db, args)
+        database = self.database()
+        if database is None:
+            return
+
+        # Run the `query` subcommand.
+        timer = PhaseTimer(enabled=self.timings)
+        query(database, args, timer=timer)
+        timer.report()
+
+    def do_explain(self, arg):
+        """Explain how a query's filters narrow down the close approaches.
+
+        This takes the same filters as `query`, counts all of the matches and
+        shows how many rows each filter rejected. Filters are evaluated in
+        order of how selective they have been in earlier queries:
+
+            (neo) explain --max-distance 0.01 --start-date 2020-06-01
+        """
+        args = self.parse_arg_with(arg, self.query)
+        if not args:
+            return
+
+        database = self.database()
+        if database is None:
+            return
+
+        explain(database, args)
+
+    def do_timings(self, arg):
+        """Turn reporting of the wall time and peak memory of each command's phases on or off.
+
+            (neo) timings on
+            (neo) timings off
+
+        Without an argument, show whether timings are currently reported.
+        """
+        if arg.strip() in ('on', 'off'):
+            self.timings = arg.strip() == 'on'
+        elif arg.strip():
+            print("Usage: timings [on|off]", file=sys.stderr)
+            return
+        print(f"Timings are {'on' if self.timings else 'off'}.")
 
     def do_EOF(self, _arg):
         """Exit the interactive session."""
@@ -315,8 +1044,12 @@ class NEOShell(cmd.Cmd):
     do_quit = do_EOF
 
     def precmd(self, line):
-        """Watch for changes to the files in this project."""
-        changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
+        """Watch for changes to the files in this project and to the data files."""
+        if self.loader is not None:
+            for path in self.loader.check():
+                print(f"{path} has changed, so the data is being reloaded in the background.", file=sys.stderr)
+
+        changed = [f for f in self.project_files if f.exists() and f.stat().st_mtime > _START]
         if changed:
             print("The following file(s) have been modified since this interactive session began: "
                   f"{', '.join(str(f.relative_to(PROJECT_ROOT)) for f in changed)}.",
@@ -329,22 +1062,158 @@ class NEOShell(cmd.Cmd):
                 return 'exit'
         return line
 
+    def postcmd(self, stop, line):
+        """Refresh the progress of a background load shown in the prompt."""
+        self.update_prompt()
+        if self.loader is not None and self.loader.message and not self.loader.busy:
+            print(self.loader.message, file=sys.stderr)
+            self.loader.message = None
+        return stop
 
-def main():
-    """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
-    args = parser.parse_args()
+
+def resolve_paths(args, cwd):
+    """Make the paths in parsed command-line arguments absolute, relative to a working directory.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param cwd: The working directory against which to resolve relative paths.
+    """
+    args.neofile = (pathlib.Path(cwd) / args.neofile).resolve()
+    args.cadfile = (pathlib.Path(cwd) / args.cadfile).resolve()
+    if getattr(args, 'outfile', None):
+        args.outfile = pathlib.Path(cwd) / args.outfile
+    if getattr(args, 'outfile_pattern', None):
+        args.outfile_pattern = os.path.join(cwd, args.outfile_pattern)
+    if getattr(args, 'pdes_file', None):
+        args.pdes_file = pathlib.Path(cwd) / args.pdes_file
+
+
+def answer(database, parser, data_files, request):
+    """Answer an `inspect` or `query` command forwarded to the `serve` subcommand.
+
+    A request is a dictionary with the client's command-line arguments ('argv')
+    and working directory ('cwd'). The response holds the command's standard
+    output ('stdout') and standard error ('stderr') - or an 'error' if the
+    request can't be answered by this server, in which case the client should
+    fall back to loading the data itself.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param parser: The top-level `argparse.ArgumentParser`.
+    :param data_files: The resolved paths of the NEO and close approach files loaded by the server.
+    :param request: The request sent by the client.
+    :return: The response to send back to the client.
+    """
+    try:
+        args = parser.parse_args(request['argv'])
+    except SystemExit:
+        return {'error': "Unable to parse the forwarded arguments."}
+    resolve_paths(args, request['cwd'])
+    if (args.neofile, args.cadfile) != data_files:
+        return {'error': "The server has loaded different data files."}
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    if args.cmd == 'inspect':
+        inspect(database, pdes=args.pdes, name=args.name, prefix=args.prefix, verbose=args.verbose,
+                stdout=stdout, stderr=stderr, start_date=args.start_date, end_date=args.end_date,
+                approach_limit=args.limit)
+    elif args.cmd == 'query':
+        query(database, args, stdout=stdout, stderr=stderr)
+    else:
+        return {'error': f"The server doesn't answer `{args.cmd}` commands."}
+    return {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+def forward_to_server(args):
+    """Try to have a running `serve` process answer this invocation's command.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: Whether the command was answered by a server.
+    """
+    try:
+        response = forward(args.socket, {'argv': sys.argv[1:], 'cwd': os.getcwd()})
+    except ServerUnavailableError:
+        return False
+    if not response or 'error' in response:
+        return False
+
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return True
+
+
+def run(parser, inspect_parser, query_parser, args):
+    """Load the data files and run the chosen subcommand.
+
+    :param parser: The top-level `argparse.ArgumentParser`.
+    :param inspect_parser: The subparser for the `inspect` subcommand.
+    :param query_parser: The subparser for the `query` subcommand.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    timer = PhaseTimer(enabled=args.timings)
+
+    # Start the interactive session immediately, and load the data in the background.
+    if args.cmd == 'interactive':
+        loader = BackgroundLoader(args.neofile, args.cadfile, timer=timer)
+        NEOShell(None, inspect_parser, query_parser,
+                 aggressive=args.aggressive, timings=args.timings, loader=loader).cmdloop()
+        return
 
     # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    with timer.phase('CSV parse'):
+        neos = load_neos(args.neofile)
+    # Querying NEOs doesn't need their close approaches, which take far longer to load.
+    with timer.phase('JSON parse'):
+        approaches = load_approaches(args.cadfile) if args.cmd != 'neos' else []
+    with timer.phase('database linking'):
+        database = NEODatabase(neos, approaches)
 
     # Run the chosen subcommand.
     if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        with timer.phase('inspect'):
+            inspect(database, pdes=args.pdes, name=args.name, prefix=args.prefix, verbose=args.verbose,
+                    start_date=args.start_date, end_date=args.end_date, approach_limit=args.limit)
     elif args.cmd == 'query':
-        query(database, args)
-    elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+        query(database, args, timer=timer)
+    elif args.cmd == 'batch':
+        batch(database, args, timer=timer)
+    elif args.cmd == 'coincident':
+        coincident(database, args, timer=timer)
+    elif args.cmd == 'timeline':
+        timeline(database, args, timer=timer)
+    elif args.cmd == 'neos':
+        query_neos(database, args, timer=timer)
+    elif args.cmd == 'serve':
+        data_files = (args.neofile.resolve(), args.cadfile.resolve())
+        print(f"Serving {len(database.listapproach)} close approaches on {args.socket}.", file=sys.stderr)
+        serve(args.socket, lambda request: answer(database, parser, data_files, request))
+
+    timer.report()
+
+
+def main():
+    """Run the main script."""
+    parser, inspect_parser, query_parser = make_parser()
+    args = parser.parse_args()
+    measuring = args.timings or args.profile
+
+    # Skip loading the data if a running server can answer this command.
+    if args.cmd in ('inspect', 'query') and not (args.no_server or measuring) and forward_to_server(args):
+        return
+    if args.cmd == 'serve' and is_listening(args.socket):
+        print(f"A server is already listening on {args.socket}.", file=sys.stderr)
+        return
+
+    if not args.profile:
+        run(parser, inspect_parser, query_parser, args)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        run(parser, inspect_parser, query_parser, args)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"Saved a profile of this run to {args.profile}.", file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -7,7 +7,8 @@ for whether the object is potentially hazardous.
 
 The `CloseApproach` class represents a close approach to Earth by an NEO. Each
 has an approach datetime, a nominal approach distance, and a relative approach
-velocity.
+velocity, as well as the uncertainties of the distance and time, the velocity
+relative to a massless Earth, and the NEO's absolute magnitude.
 
 A `NearEarthObject` maintains a collection of its close approaches, and a
 `CloseApproach` maintains a reference to its NEO.
@@ -95,6 +96,15 @@ class CloseApproach:
         self.distance = info.get('distance')
         self.velocity = info.get('velocity')
 
+        # The 3-sigma bounds of the distance, in au, and the uncertainty of the time, in minutes.
+        nan = float('nan')
+        self.distance_min = info.get('distance_min', nan)
+        self.distance_max = info.get('distance_max', nan)
+        self.time_sigma = info.get('time_sigma', nan)
+        # The velocity relative to a massless Earth, in km/s, and the NEO's absolute magnitude.
+        self.velocity_infinity = info.get('velocity_infinity', nan)
+        self.magnitude = info.get('magnitude', nan)
+
         self.neo = info.get('neo')
 
     @property
@@ -112,16 +122,27 @@ class CloseApproach:
         """
         return datetime_to_str(self.time)
 
-    def __str__(self):
-        """Return `str(self)`."""
+    @property
+    def display_name(self):
+        """Return the name of this `CloseApproach`'s NEO as shown by `str`: its designation, then any name."""
         if not self.neo.name:
-            fname = self.designation
-        else:
-            fname = '{}({})'.format(self.designation, self.neo.name)
+            return self.designation
+        return '{}({})'.format(self.designation, self.neo.name)
 
+    def describe(self, display_name=None):
+        """Return a human-readable description of this `CloseApproach`, as in `str(self)`.
+
+        :param display_name: The `display_name` of this approach's NEO, if it has already been computed.
+        :return: A one-line string.
+        """
+        fname = display_name or self.display_name
         return f"- On {self.time_str}, '{fname}' approaches Earth at a distance of {float(self.distance):.2f} au " \
                f"and a velocity of {float(self.velocity):.2f} km/s."
 
+    def __str__(self):
+        """Return `str(self)`."""
+        return self.describe()
+
     def __repr__(self):
         """Return `repr(self)`, a computer-readable string representation of this object."""
         return (f"CloseApproach(time={self.time_str!r}, distance={self.distance:.2f}, "
@@ -0,0 +1,131 @@
+"""Answer commands for an already-loaded `NEODatabase` over a local Unix domain socket.
+
+Loading the data files is by far the slowest part of running `main.py`. The
+`serve` function keeps one process (with one loaded database) listening on a
+Unix domain socket, and the `forward` function sends a command from another
+process to it, so that short-lived clients such as cron jobs skip the load.
+
+The protocol is deliberately tiny. A client connects, sends one request as a
+line of JSON and reads back one response as JSON until the server closes the
+connection. The contents of requests and responses are decided by the caller
+of `serve` - in practice, the main module's `answer` function.
+
+Each request is answered on a worker thread, so that a slow query doesn't
+stop the event loop from accepting and answering other clients.
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+
+
+class ServerUnavailableError(OSError):
+    """No server is listening on the requested socket."""
+
+
+async def _serve(path, handler):
+    """Accept connections on a Unix domain socket until cancelled.
+
+    :param path: The path of the Unix domain socket.
+    :param handler: A 1-argument callable mapping a request to a JSON-serializable response.
+    """
+    loop = asyncio.get_event_loop()
+
+    async def handle(reader, writer):
+        try:
+            request = json.loads(await reader.readline())
+            # An empty request is a probe for whether the server is alive.
+            response = None if request is None else await loop.run_in_executor(None, handler, request)
+        except Exception as err:
+            response = {'error': f"{err.__class__.__name__}: {err}"}
+        try:
+            writer.write(json.dumps(response).encode())
+            await writer.drain()
+        finally:
+            writer.close()
+
+    # Stop cleanly (removing the socket file) on SIGINT or SIGTERM.
+    stop = asyncio.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+    server = await asyncio.start_unix_server(handle, path=path)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def serve(path, handler):
+    """Serve requests on a Unix domain socket until interrupted.
+
+    A stale socket file left behind by a server that is no longer running is
+    replaced, but a socket with a live server behind it is not.
+
+    :param path: The path of the Unix domain socket.
+    :param handler: A 1-argument callable mapping a request to a JSON-serializable response.
+    """
+    path = os.fspath(path)
+    if is_listening(path):
+        raise OSError(f"A server is already listening on {path}.")
+    if os.path.exists(path):
+        os.unlink(path)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_serve(path, handler))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def is_listening(path):
+    """Return whether a server is listening on a Unix domain socket.
+
+    :param path: The path of the Unix domain socket.
+    :return: True if a server answered a probe on `path`.
+    """
+    try:
+        forward(path, None, timeout=5)
+    except OSError:
+        return False
+    return True
+
+
+def forward(path, request, timeout=None):
+    """Send a request to a running server and wait for its response.
+
+    :param path: The path of the server's Unix domain socket.
+    :param request: A JSON-serializable request.
+    :param timeout: The maximum number of seconds to wait on the socket, or None to wait forever.
+    :return: The server's response.
+    :raises ServerUnavailableError: If no server is listening on `path`.
+    """
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (AttributeError, OSError) as err:
+        raise ServerUnavailableError(f"Unix domain sockets are unavailable: {err}") from err
+
+    with client:
+        client.settimeout(timeout)
+        try:
+            client.connect(os.fspath(path))
+        except (FileNotFoundError, ConnectionRefusedError) as err:
+            raise ServerUnavailableError(f"No server is listening on {path}.") from err
+
+        client.sendall(json.dumps(request).encode() + b'\n')
+        chunks = []
+        while True:
+            chunk = client.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    return json.loads(b''.join(chunks)) if chunks else None
@@ -0,0 +1,55 @@
+"""Check that the `batch` subcommand answers each query in a file of queries.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_batch
+"""
+import io
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import batch, make_parser
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _, _ = make_parser()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queries = pathlib.Path(self.tmpdir.name) / 'queries.jsonl'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_batch(self, *lines):
+        self.queries.write_text(''.join(line + '\n' for line in lines))
+        stdout = io.StringIO()
+        batch(self.db, self.parser.parse_args(['batch', '--queries', str(self.queries)]), stdout=stdout)
+        return stdout.getvalue().splitlines()
+
+    def test_queries_without_a_limit_print_ten_results(self):
+        lines = self.run_batch('{"hazardous": true}')
+        self.assertEqual(lines[0], '# Query 1: 10 result(s)')
+        self.assertEqual(len(lines), 11)
+
+    def test_limit_zero_prints_every_match(self):
+        expected = sum(1 for approach in self.db.listapproach if approach.neo.hazardous)
+        lines = self.run_batch('{"hazardous": true, "limit": 0}', '{"hazardous": true, "limit": 3}')
+        self.assertEqual(lines[0], f'# Query 1: {expected} result(s)')
+        self.assertEqual(lines[expected + 1], '# Query 2: 3 result(s)')
+        self.assertEqual(len(lines), expected + 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
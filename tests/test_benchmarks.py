@@ -0,0 +1,44 @@
+"""Check that the synthetic benchmark datasets are deterministic and loadable.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_benchmarks
+"""
+import pathlib
+import tempfile
+import unittest
+
+from benchmarks.generate import generate
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+class TestGenerate(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_generated_dataset_is_deterministic(self):
+        first = [path.read_bytes() for path in generate(500, seed=1, outdir=self.root / 'a')]
+        second = [path.read_bytes() for path in generate(500, seed=1, outdir=self.root / 'b')]
+        third = [path.read_bytes() for path in generate(500, seed=2, outdir=self.root / 'c')]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+
+    def test_generated_dataset_loads_and_links(self):
+        neo_path, cad_path = generate(500, outdir=self.root)
+        neos, approaches = load_neos(neo_path), load_approaches(cad_path)
+        db = NEODatabase(neos, approaches)
+
+        self.assertEqual(len(approaches), 500)
+        self.assertEqual(len(db.listapproach), 500)
+        self.assertEqual(len({neo.designation for neo in neos}), len(neos))
+        times = [approach.time for approach in approaches]
+        self.assertEqual(times, sorted(times))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,13 +10,17 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import datetime
 import pathlib
 import math
+import threading
 import unittest
 
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
+from filters import create_filters
+from models import NearEarthObject, CloseApproach
 
 
 # Paths to the test data files.
@@ -117,6 +121,122 @@ class TestDatabase(unittest.TestCase):
 
         self.assertIsNone(nonexistent)
 
+    def test_get_neos_by_prefix(self):
+        cerberus = self.db.get_neo_by_designation('1865')
+        self.assertIn(cerberus, self.db.get_neos_by_prefix('cerb'))
+        self.assertIn(cerberus, self.db.get_neos_by_prefix('186'))
+        self.assertEqual(len(self.db.get_neos_by_prefix('2020', limit=3)), 3)
+        self.assertEqual(self.db.get_neos_by_prefix('no such neo'), [])
+
+    def test_complete(self):
+        self.assertEqual(self.db.complete('Cerb', 'name'), ['Cerberus'])
+        designations = self.db.complete('2020 A')
+        self.assertEqual(designations, sorted(designations, key=str.casefold))
+        self.assertTrue(all(designation.startswith('2020 A') for designation in designations))
+
+    def test_neo_approaches_are_sorted_by_time(self):
+        for neo in self.neos:
+            times = [approach.time for approach in neo.approaches]
+            self.assertEqual(times, sorted(times))
+
+    def test_approaches_of(self):
+        neo = self.db.get_neo_by_designation('68347')
+        self.assertEqual(self.db.approaches_of(neo), neo.approaches)
+        between = self.db.approaches_of(neo, datetime.date(2020, 2, 8), datetime.date(2020, 8, 4))
+        self.assertEqual([approach.time_str for approach in between], ['2020-02-08 10:30', '2020-08-04 04:22'])
+        self.assertEqual(self.db.approaches_of(neo, start_date=datetime.date(2020, 2, 9), limit=1), [between[1]])
+        self.assertEqual(self.db.approaches_of(neo, end_date=datetime.date(2019, 12, 31)), [])
+
+    def test_summary(self):
+        neo = self.db.get_neo_by_designation('68347')
+        summary = self.db.summary(neo)
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.closest, min(neo.approaches, key=lambda approach: approach.distance))
+        # The test data is all from 2020, so there's no next approach from now on.
+        self.assertIsNone(summary.next_approach)
+        self.assertIs(self.db.summary(neo), summary)
+
+        summary = self.db.summary(neo, now=datetime.datetime(2020, 6, 1))
+        self.assertEqual(summary.next_approach.time_str, '2020-08-04 04:22')
+
+
+class TestDatabaseRefresh(unittest.TestCase):
+    def setUp(self):
+        self.neos = load_neos(TEST_NEO_FILE)
+        self.approaches = load_approaches(TEST_CAD_FILE)
+        self.db = NEODatabase(self.neos, self.approaches)
+
+    def test_refresh_swaps_in_new_contents(self):
+        epoch = self.db.epoch
+        self.db.refresh(self.neos, self.approaches[:100])
+
+        self.assertEqual(self.db.epoch, epoch + 1)
+        self.assertEqual(len(self.db.listapproach), 100)
+        self.assertEqual(sum(len(neo.approaches) for neo in self.neos), 100)
+
+    def test_running_query_keeps_its_snapshot(self):
+        results = self.db.query(create_filters())
+        first = next(results)
+        self.db.refresh(self.neos, self.approaches[:10])
+
+        self.assertEqual(1 + sum(1 for _ in results), len(self.approaches))
+        self.assertIs(first, self.approaches[0])
+        self.assertEqual(sum(1 for _ in self.db.query(create_filters())), 10)
+
+    def test_concurrent_queries_during_refreshes(self):
+        sizes = (len(self.approaches), 1000)
+        counts = []
+
+        def reader():
+            for _ in range(20):
+                counts.append(sum(1 for _ in self.db.query(create_filters())))
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for n in range(20):
+            self.db.refresh(self.neos, self.approaches[:sizes[n % 2]])
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(len(counts), 80)
+        self.assertTrue(set(counts) <= set(sizes))
+
+    def test_diff_against_a_fresh_load(self):
+        reloaded = load_approaches(TEST_CAD_FILE)
+        self.assertEqual(self.db.diff(reloaded), ([], []))
+
+        added, removed = self.db.diff(reloaded[10:] + reloaded[:5])
+        self.assertEqual(added, [])
+        self.assertEqual(len(removed), 5)
+
+    def test_apply_keeps_unchanged_approaches(self):
+        self.db.refresh(self.neos, self.approaches[:-10])
+        added, removed = self.db.diff(load_approaches(TEST_CAD_FILE)[5:])
+        self.assertEqual((len(added), len(removed)), (10, 5))
+
+        epoch = self.db.epoch
+        self.db.apply(added, removed)
+        self.assertEqual(self.db.epoch, epoch + 1)
+        self.assertEqual(len(self.db.listapproach), len(self.approaches) - 5)
+        self.assertIs(self.db.listapproach[0], self.approaches[5])
+        self.assertTrue(all(a.time <= b.time for a, b in zip(self.db.listapproach, self.db.listapproach[1:])))
+        self.assertEqual(sum(len(neo.approaches) for neo in self.neos), len(self.approaches) - 5)
+
+    def test_apply_leaves_older_snapshots_intact(self):
+        neo = NearEarthObject(designation='1')
+        first, second = (CloseApproach(designation='1', time=time, distance=0.1)
+                         for time in ('2020-Jan-01 00:00', '2020-Feb-01 00:00'))
+        db = NEODatabase([neo], [first, second])
+        old = db.snapshot
+
+        db.apply(removed=[second])
+        self.assertEqual(db.approaches_of(neo), [first])
+        self.assertEqual(old.approaches_by_neo[old.by_designation['1']], (first, second))
+        self.assertEqual(old.summaries[neo].count, 2)
+        watchlist, = create_filters(designations=['1'])
+        self.assertEqual(watchlist.candidates(old), [first, second])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -117,6 +117,23 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsNotNone(approach)
         self.assertIsInstance(approach.velocity, float)
 
+    def test_approach_uncertainties_are_loaded(self):
+        approach = self.get_first_approach_or_none()
+        self.assertIsNotNone(approach)
+        # ['2020 AY1', ..., '0.0211628345552616', '0.0211692704882042', '5.62203195551878', '5.59959589405614',
+        #  '< 00:01', '25.1']
+        self.assertAlmostEqual(approach.distance_min, 0.0211628345552616)
+        self.assertAlmostEqual(approach.distance_max, 0.0211692704882042)
+        self.assertAlmostEqual(approach.velocity_infinity, 5.59959589405614)
+        self.assertEqual(approach.time_sigma, 1.0)
+        self.assertEqual(approach.magnitude, 25.1)
+
+    def test_approach_time_sigma_is_in_minutes(self):
+        # ['2013 EC20', ..., '3_08:05', '29.']
+        approach = self.approaches[2]
+        self.assertEqual(approach.time_sigma, (3 * 24 + 8) * 60 + 5)
+        self.assertEqual(approach.magnitude, 29.0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -12,13 +12,18 @@ To run these tests from the project root, run::
 
 These tests should pass when Tasks 3a and 3b are complete.
 """
+import asyncio
 import datetime
+import operator
 import pathlib
 import unittest
+from unittest import mock
 
-from database import NEODatabase
+import database
+from database import NEODatabase, filter_key
 from extract import load_neos, load_approaches
-from filters import create_filters
+from filters import AttributeFilter, create_filters
+from models import NearEarthObject, CloseApproach
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -537,5 +542,396 @@ class TestQuery(unittest.TestCase):
         self.assertEqual(expected, received, msg="Computed results do not match expected results.")
 
 
+class TestQueryStats(unittest.TestCase):
+    def setUp(self):
+        self.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_query_records_counters(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.05)
+        matches = list(self.db.query(filters))
+
+        stats = self.db.last_stats
+        self.assertEqual(stats.scanned, len(self.db.listapproach))
+        self.assertEqual(stats.yielded, len(matches))
+        self.assertEqual(sum(stats.rejected.values()), stats.scanned - stats.yielded)
+        for approach_filter in filters:
+            key = filter_key(approach_filter)
+            self.assertLessEqual(stats.rejected[key], stats.evaluated[key])
+        self.assertEqual(self.db.stats.queries, 1)
+
+    def test_query_adds_its_counters_to_given_stats(self):
+        filters = create_filters(hazardous=True)
+        stats = database.QueryStats()
+        list(self.db.query(filters, stats))
+        list(self.db.query(create_filters()))
+
+        self.assertEqual(stats.queries, 1)
+        self.assertEqual(stats.scanned, len(self.db.listapproach))
+        self.assertEqual(list(stats.evaluated), [filter_key(filters[0])])
+        self.assertEqual(self.db.stats_copy().queries, 2)
+
+    def test_closed_query_records_counters(self):
+        results = self.db.query(create_filters())
+        next(results)
+        results.close()
+        self.assertEqual(self.db.last_stats.yielded, 1)
+        self.assertEqual(self.db.last_stats.scanned, 1)
+
+    def test_selective_filters_are_evaluated_first(self):
+        filters = create_filters(start_date=datetime.date(2020, 1, 2), distance_max=0.01)
+        self.assertEqual(self.db.stats.order(filters), filters)
+
+        list(self.db.query(filters))
+        list(self.db.query(filters))
+        self.assertEqual(self.db.stats.order(filters), filters[::-1])
+        self.assertEqual(self.db.last_stats.evaluated[filter_key(filters[1])], self.db.last_stats.scanned)
+
+
+class TestFilterMasks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_masks_match_filters(self):
+        columns = self.db.snapshot.columns
+        filters = create_filters(date=datetime.date(2020, 3, 2), start_date=datetime.date(2020, 6, 1),
+                                 distance_min=0.1, velocity_max=10, diameter_max=1.0, hazardous=False)
+        for approach_filter in filters:
+            expected = [bool(approach_filter(approach)) for approach in self.db.listapproach]
+            self.assertEqual([bool(value) for value in approach_filter.mask(columns)], expected,
+                             msg=repr(approach_filter))
+
+    def test_custom_filters_have_masks(self):
+        class DesignationFilter(AttributeFilter):
+            @classmethod
+            def get(cls, approach):
+                return approach.designation
+
+        approach_filter = DesignationFilter(operator.eq, '2019 YK')
+        expected = [approach for approach in self.db.listapproach if approach.designation == '2019 YK']
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query([approach_filter])), expected)
+
+    def test_masked_query_across_chunks(self):
+        filters = create_filters(distance_max=0.1, hazardous=False)
+        expected = [approach for approach in self.db.listapproach if all(f(approach) for f in filters)]
+        with mock.patch.object(database, 'MASK_CHUNK_SIZE', 100):
+            self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertEqual(self.db.last_stats.scanned, len(self.db.listapproach))
+        self.assertEqual(sum(self.db.last_stats.rejected.values()), len(self.db.listapproach) - len(expected))
+
+
+class TestDesignationFilter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_query_watchlist(self):
+        watchlist = {'1865', '2019 YK', '2020 AY1', 'no such neo'}
+        filters = create_filters(designations=watchlist, distance_max=0.1)
+        expected = [approach for approach in self.db.listapproach
+                    if approach.designation in watchlist and approach.distance <= 0.1]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_query_watchlist_scans_only_its_approaches(self):
+        neo = self.db.get_neo_by_designation('1865')
+        list(self.db.query(create_filters(designations=['1865'])))
+        self.assertEqual(self.db.last_stats.scanned, len(neo.approaches))
+        self.assertEqual(self.db.last_stats.yielded, len(neo.approaches))
+
+    def test_empty_watchlist(self):
+        self.assertEqual(list(self.db.query(create_filters(designations=[]))), [])
+
+
+class TestUncertaintyFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_query_with_uncertainty_bounds(self):
+        filters = create_filters(dist_max_max=0.05, time_sigma_max=10, magnitude_max=26)
+        expected = [approach for approach in self.db.listapproach
+                    if approach.distance_max <= 0.05 and approach.time_sigma <= 10 and approach.magnitude <= 26]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_certainly_within_is_stricter_than_nominally_within(self):
+        nominal = set(self.db.query(create_filters(distance_max=0.05)))
+        certain = set(self.db.query(create_filters(dist_max_max=0.05)))
+        self.assertLess(certain, nominal)
+
+    def test_possibly_and_certainly_within(self):
+        for distance in (0.0, 0.01, 0.05, 0.5):
+            possibly = [approach for approach in self.db.listapproach if approach.distance_min <= distance]
+            certainly = [approach for approach in self.db.listapproach if approach.distance_max <= distance]
+            self.assertEqual(self.db.approaches_within(distance), possibly)
+            self.assertEqual(self.db.approaches_within(distance, certain=True), certainly)
+            self.assertEqual(self.db.count_approaches_within([distance]), [len(possibly)])
+            self.assertEqual(self.db.count_approaches_within([distance], certain=True), [len(certainly)])
+
+    def test_selective_interval_query_uses_index(self):
+        filters = create_filters(dist_min_max=0.01, velocity_max=10)
+        expected = [approach for approach in self.db.listapproach
+                    if approach.distance_min <= 0.01 and approach.velocity <= 10]
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertLess(self.db.last_stats.scanned, len(self.db.listapproach) * 0.25)
+
+        # An unselective interval query scans everything instead.
+        list(self.db.query(create_filters(dist_min_max=1.0)))
+        self.assertEqual(self.db.last_stats.scanned, len(self.db.listapproach))
+
+
+class TestCoincident(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_coincident_groups_match_a_sweep_anchored_at_each_group(self):
+        window = datetime.timedelta(minutes=5)
+        filters = create_filters(distance_max=0.1)
+        groups = list(self.db.coincident(window, filters))
+        self.assertGreater(len(groups), 0)
+
+        # Split the time-ordered matches wherever an approach is beyond the window of its group's first approach.
+        expected, group = [], []
+        for approach in sorted(self.db.query(filters), key=lambda approach: approach.time):
+            if group and approach.time - group[0].time > window:
+                expected.append(group)
+                group = []
+            group.append(approach)
+        expected.append(group)
+        expected = [group for group in expected if len({approach.neo for approach in group}) > 1]
+        self.assertEqual(groups, expected)
+
+        for group in groups:
+            self.assertLessEqual(group[-1].time - group[0].time, window)
+            self.assertTrue(all(filters[0](approach) for approach in group))
+
+    def test_coincident_groups_do_not_chain_beyond_the_window(self):
+        neos = [NearEarthObject(designation=designation) for designation in ('1', '2', '3')]
+        approaches = [CloseApproach(designation=neo.designation, time=f'2020-Jan-01 00:{minute:02}')
+                      for neo, minute in zip(neos, (0, 4, 8))]
+        db = NEODatabase(neos, approaches)
+
+        # Each approach is within 5 minutes of the one before, but the last is 8 minutes after the first.
+        groups = list(db.coincident(datetime.timedelta(minutes=5)))
+        self.assertEqual(groups, [approaches[:2]])
+
+    def test_coincident_with_no_window(self):
+        for group in self.db.coincident(datetime.timedelta(0)):
+            self.assertEqual(len({approach.time for approach in group}), 1)
+
+
+class TestRolling(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def brute_force(self, filters, start, end):
+        return [approach for approach in self.db.query(filters) if start <= approach.time < end]
+
+    def test_rolling_count_matches_per_window_queries(self):
+        filters = create_filters(hazardous=True)
+        rows = list(self.db.rolling(filters, window_days=10, step_days=3))
+        self.assertGreater(len(rows), 0)
+        for start, end, count in rows:
+            self.assertEqual(end - start, datetime.timedelta(days=10))
+            self.assertEqual(count, len(self.brute_force(filters, start, end)))
+
+    def test_rolling_min_distance_matches_per_window_queries(self):
+        filters = create_filters(velocity_min=20)
+        for start, end, nearest in self.db.rolling(filters, window_days=2, step_days=5, metric='min_distance'):
+            matches = self.brute_force(filters, start, end)
+            self.assertEqual(nearest, min((approach.distance for approach in matches), default=None))
+
+    def test_rolling_starts_at_given_date(self):
+        rows = list(self.db.rolling(window_days=7, start=datetime.date(2019, 12, 1)))
+        self.assertEqual(rows[0][0], datetime.datetime(2019, 12, 1))
+        self.assertEqual(rows[0][2], 0)
+        self.assertEqual(sum(count for _, _, count in rows), len(self.db.listapproach))
+
+    def test_rolling_rejects_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            self.db.rolling(metric='mean_velocity')
+        with self.assertRaises(ValueError):
+            self.db.rolling(window_days=0)
+
+
+class TestNearest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def check_nearest(self, when, k, filters=()):
+        found = self.db.nearest(when, k, filters)
+        matches = [approach for approach in self.db.listapproach
+                   if all(approach_filter(approach) for approach_filter in filters)]
+        gaps = sorted(abs(approach.time - when) for approach in matches)[:k]
+        self.assertEqual(len(found), min(k, len(matches)))
+        self.assertEqual(sorted(abs(approach.time - when) for approach in found), gaps)
+        self.assertEqual(found, sorted(found, key=lambda approach: approach.time))
+        return found
+
+    def test_nearest_in_the_middle(self):
+        self.check_nearest(datetime.datetime(2020, 6, 15, 12, 0), 25)
+
+    def test_nearest_with_filters(self):
+        found = self.check_nearest(datetime.datetime(2020, 6, 15, 12, 0), 5, create_filters(hazardous=True))
+        self.assertTrue(all(approach.neo.hazardous for approach in found))
+
+    def test_nearest_at_the_ends(self):
+        self.check_nearest(datetime.datetime(1900, 1, 1), 3)
+        self.check_nearest(datetime.datetime(2100, 1, 1), 3)
+
+    def test_nearest_to_a_date(self):
+        found = self.db.nearest(datetime.date(2020, 3, 2), 1)
+        self.assertEqual(found, self.db.nearest(datetime.datetime(2020, 3, 2), 1))
+
+
+class TestQueryMany(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_query_many_matches_separate_queries(self):
+        filter_sets = [
+            create_filters(),
+            create_filters(date=datetime.date(2020, 3, 2)),
+            create_filters(distance_max=0.1, hazardous=True),
+            create_filters(diameter_min=1.0, velocity_max=20),
+        ]
+        received = self.db.query_many(filter_sets)
+        expected = [list(self.db.query(filters)) for filters in filter_sets]
+        self.assertEqual(received, expected)
+
+    def test_query_many_respects_limits(self):
+        filter_sets = [create_filters(), create_filters(hazardous=True), create_filters(hazardous=False)]
+        received = self.db.query_many(filter_sets, [5, 0, 3])
+
+        self.assertEqual(received[0], list(self.db.query(filter_sets[0]))[:5])
+        self.assertEqual(received[1], list(self.db.query(filter_sets[1])))
+        self.assertEqual(received[2], list(self.db.query(filter_sets[2]))[:3])
+
+
+class TestAsyncQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def run_until_complete(self, coroutine):
+        # Like `asyncio.run`, which needs Python 3.7+.
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def collect(self, filters, batch_size):
+        async def run():
+            return [batch async for batch in self.db.aquery(filters, batch_size=batch_size)]
+        return self.run_until_complete(run())
+
+    def test_aquery_batches_match_query(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), hazardous=True)
+        expected = list(self.db.query(filters))
+        self.assertGreater(len(expected), 0)
+
+        batches = self.collect(filters, batch_size=7)
+        self.assertEqual([approach for batch in batches for approach in batch], expected)
+        self.assertTrue(all(0 < len(batch) <= 7 for batch in batches))
+
+    def test_aquery_leaves_event_loop_responsive(self):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def run():
+            task = asyncio.ensure_future(ticker())
+            batches = [batch async for batch in self.db.aquery(create_filters(), batch_size=100)]
+            task.cancel()
+            return batches
+
+        batches = self.run_until_complete(run())
+        self.assertEqual(sum(map(len, batches)), len(self.db.listapproach))
+        self.assertGreaterEqual(len(ticks), len(batches))
+
+    def test_abandoned_aquery_closes_its_scan(self):
+        async def run():
+            batches = self.db.aquery(create_filters(), batch_size=10)
+            async for batch in batches:
+                break
+            await batches.aclose()
+
+        self.db.last_stats = None
+        self.run_until_complete(run())
+        self.assertIsNotNone(self.db.last_stats)
+        self.assertEqual(self.db.last_stats.yielded, 10)
+
+
+class TestQueryNeos(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def check_query_neos(self, diameter_min=None, diameter_max=None, hazardous=None):
+        expected = [neo for neo in self.db.listneo
+                    if (diameter_min is None or neo.diameter >= diameter_min)
+                    and (diameter_max is None or neo.diameter <= diameter_max)
+                    and (hazardous is None or neo.hazardous == hazardous)]
+        self.assertEqual(list(self.db.query_neos(diameter_min, diameter_max, hazardous)), expected)
+        return expected
+
+    def test_query_neos_by_diameter(self):
+        self.assertTrue(self.check_query_neos(diameter_min=1.0))
+        self.assertTrue(self.check_query_neos(diameter_min=0.5, diameter_max=1.5))
+        self.assertEqual(self.check_query_neos(diameter_min=2.0, diameter_max=1.0), [])
+
+    def test_query_neos_by_hazard(self):
+        self.assertTrue(self.check_query_neos(hazardous=True))
+        self.assertTrue(self.check_query_neos(hazardous=False))
+        self.assertTrue(self.check_query_neos(diameter_min=1.0, hazardous=True))
+
+    def test_query_neos_without_criteria(self):
+        self.assertEqual(len(self.check_query_neos()), len(self.db.listneo))
+
+
+class TestQueryDistinct(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def check_query_distinct(self, pick, key, filters=()):
+        best = {}
+        for approach in self.db.query(filters):
+            if approach.neo not in best or key(approach) < key(best[approach.neo]):
+                best[approach.neo] = approach
+        expected = sorted(best.values(), key=lambda approach: approach.time)
+        self.assertEqual(list(self.db.query_distinct(filters, pick)), expected)
+
+    def test_query_distinct_picks(self):
+        self.check_query_distinct('first', lambda approach: approach.time)
+        self.check_query_distinct('closest', lambda approach: approach.distance)
+        self.check_query_distinct('fastest', lambda approach: -approach.velocity)
+
+    def test_query_distinct_with_filters(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1), hazardous=True)
+        self.check_query_distinct('closest', lambda approach: approach.distance, filters)
+
+    def test_query_distinct_doesnt_depend_on_the_order_of_approaches(self):
+        neos, approaches = load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(neos, approaches[::-1])
+        found = list(db.query_distinct(pick='first'))
+        self.assertEqual(found, sorted(found, key=lambda approach: approach.time))
+        self.assertEqual(set(found), {neo.approaches[0] for neo in neos if neo.approaches})
+
+    def test_query_distinct_rejects_unknown_picks(self):
+        with self.assertRaises(ValueError):
+            self.db.query_distinct(pick='slowest')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+"""Check that commands can be forwarded to a server over a Unix domain socket.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import pathlib
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from server import ServerUnavailableError, forward, is_listening, serve
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix domain sockets are unavailable.")
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = pathlib.Path(cls.tmpdir.name) / 'neo.sock'
+
+        # The server thread runs until the test process exits.
+        thread = threading.Thread(target=serve, args=(cls.path, lambda request: {'echo': request}), daemon=True)
+        thread.start()
+        for _ in range(100):
+            if is_listening(cls.path):
+                break
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_server_answers_requests(self):
+        self.assertEqual(forward(self.path, {'argv': ['query']}), {'echo': {'argv': ['query']}})
+
+    def test_server_answers_concurrent_clients(self):
+        responses = {}
+
+        def client(n):
+            responses[n] = forward(self.path, {'n': n})
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(responses, {n: {'echo': {'n': n}} for n in range(10)})
+
+    def test_missing_server_is_unavailable(self):
+        with self.assertRaises(ServerUnavailableError):
+            forward(self.path.with_name('missing.sock'), {})
+        self.assertFalse(is_listening(self.path.with_name('missing.sock')))
+
+
+if __name__ == '__main__':
+    unittest.main()
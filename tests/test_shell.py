@@ -0,0 +1,126 @@
+"""Check that the interactive shell can start while the data is still loading.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_shell
+"""
+import contextlib
+import io
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from main import BackgroundLoader, NEOShell, make_parser
+
+
+# Paths to the test data files.
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    def test_loader_links_neos_and_approaches(self):
+        loader = BackgroundLoader(TEST_NEO_FILE, TEST_CAD_FILE)
+        database = loader.wait()
+        self.assertTrue(loader.ready)
+        self.assertIsNone(loader.error)
+        self.assertEqual(len(database.listapproach), 4700)
+        self.assertTrue(all(approach.neo is not None for approach in database.listapproach))
+
+    def test_loader_makes_neos_available_first(self):
+        loader = BackgroundLoader(TEST_NEO_FILE, TEST_CAD_FILE)
+        database = loader.wait(approaches=False)
+        self.assertIsNotNone(database.get_neo_by_designation('1865'))
+
+    def test_loader_records_errors(self):
+        loader = BackgroundLoader(TESTS_ROOT / 'missing.csv', TEST_CAD_FILE)
+        self.assertIsNone(loader.wait())
+        self.assertIsInstance(loader.error, FileNotFoundError)
+        self.assertEqual(loader.status, 'failed')
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.neofile = shutil.copy(TEST_NEO_FILE, self.tmpdir.name)
+        self.cadfile = shutil.copy(TEST_CAD_FILE, self.tmpdir.name)
+        self.loader = BackgroundLoader(self.neofile, self.cadfile)
+        self.database = self.loader.wait()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_unchanged_files_are_not_reloaded(self):
+        self.assertEqual(self.loader.check(), [])
+        self.assertEqual(self.database.epoch, 1)
+
+    def test_changed_approaches_are_applied_as_a_diff(self):
+        with open(self.cadfile) as infile:
+            contents = json.load(infile)
+        contents['data'] = contents['data'][3:]
+        with open(self.cadfile, 'w') as outfile:
+            json.dump(contents, outfile)
+        os.utime(self.cadfile, ns=(0, 0))
+
+        first = self.database.listapproach[3]
+        self.assertEqual(self.loader.check(), [self.cadfile])
+        self.loader.thread.join()
+
+        self.assertEqual(self.database.epoch, 2)
+        self.assertEqual(len(self.database.listapproach), 4697)
+        self.assertIs(self.database.listapproach[0], first)
+        self.assertIn('3 removed', self.loader.message)
+
+
+class TestShellLoading(unittest.TestCase):
+    def setUp(self):
+        _, inspect_parser, query_parser = make_parser()
+        self.loader = BackgroundLoader(TEST_NEO_FILE, TEST_CAD_FILE)
+        self.shell = NEOShell(None, inspect_parser, query_parser, loader=self.loader)
+
+    def test_shell_commands_wait_for_the_data(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            self.shell.onecmd('query --date 2020-01-01 --limit 1')
+        self.assertIn('2020-01-01', stdout.getvalue())
+
+    def test_query_limit_zero_prints_every_match(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            self.shell.onecmd('query --limit 0 --format csv')
+        # A header row, and one row per close approach.
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4701)
+
+    def test_inspect_summarizes_approaches_once_they_are_loaded(self):
+        self.loader.wait()
+        # Pretend that the close approaches are still loading.
+        self.loader.approaches_ready.clear()
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            self.shell.onecmd('inspect --pdes 1865')
+        self.assertIn('Cerberus', stdout.getvalue())
+        self.assertIn('still loading', stdout.getvalue())
+
+        self.loader.approaches_ready.set()
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            self.shell.onecmd('inspect --pdes 1865')
+        self.assertIn('Known close approaches: 1', stdout.getvalue())
+
+    def test_prompt_shows_progress_until_loaded(self):
+        self.loader.wait()
+        self.shell.postcmd(False, '')
+        self.assertEqual(self.shell.prompt, NEOShell.prompt)
+
+    def test_complete_inspect(self):
+        self.loader.wait()
+        self.assertEqual(self.shell.complete_inspect('Cerb', 'inspect --name Cerb', 15, 19), ['Cerberus'])
+        self.assertIn('--prefix', self.shell.complete_inspect('--p', 'inspect --p', 8, 11))
+        # Only the word being completed is replaced, even if the designation contains a space.
+        completions = self.shell.complete_inspect('Y', 'inspect --pdes 2019 Y', 20, 21)
+        self.assertTrue(completions)
+        self.assertTrue(all(completion.startswith('Y') for completion in completions))
@@ -0,0 +1,59 @@
+"""Check that a `PhaseTimer` attributes time to the right phases.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_timing
+"""
+import io
+import time
+import unittest
+
+from timing import PhaseTimer
+
+
+def slow_stream(n, delay):
+    for value in range(n):
+        time.sleep(delay)
+        yield value
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_phase_records_elapsed_time(self):
+        timer = PhaseTimer()
+        with timer.phase('sleep'):
+            time.sleep(0.02)
+        self.assertGreaterEqual(timer.seconds['sleep'], 0.02)
+
+    def test_timed_stream_is_excluded_from_consuming_phase(self):
+        timer = PhaseTimer()
+        with timer.phase('write', excluding=('scan',)):
+            for _ in timer.timed('scan', slow_stream(5, 0.01)):
+                pass
+        self.assertGreaterEqual(timer.seconds['scan'], 0.05)
+        self.assertLess(timer.seconds['write'], 0.05)
+
+    def test_disabled_timer_records_nothing(self):
+        timer = PhaseTimer(enabled=False)
+        with timer.phase('sleep'):
+            pass
+        self.assertEqual(list(timer.timed('scan', range(3))), [0, 1, 2])
+        self.assertEqual(timer.seconds, {})
+
+        buf = io.StringIO()
+        timer.report(buf)
+        self.assertEqual(buf.getvalue(), '')
+
+    def test_report_lists_phases_in_order(self):
+        timer = PhaseTimer()
+        for name in ('CSV parse', 'JSON parse', 'query scan'):
+            with timer.phase(name):
+                pass
+
+        buf = io.StringIO()
+        timer.report(buf)
+        lines = buf.getvalue().splitlines()
+        self.assertEqual([line.split('  ')[0] for line in lines[1:4]], ['CSV parse', 'JSON parse', 'query scan'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,16 +18,20 @@ import collections.abc
 import contextlib
 import csv
 import datetime
+import gzip
 import io
 import json
 import pathlib
+import tempfile
+import threading
 import unittest
 import unittest.mock
 
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from write import (NEO_WRITERS, write_groups_to_csv, write_neos_to_csv, write_neos_to_json, write_partitioned,
+                   write_pipelined, write_to_csv, write_to_json, write_to_ndjson, write_to_stream, writer_for)
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +230,188 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestWriteToNDJSON(unittest.TestCase):
+    def setUp(self):
+        self.results = build_results(5)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ndjson_has_one_record_per_line(self):
+        path = self.root / 'results.ndjson'
+        write_to_ndjson(self.results, path)
+
+        lines = path.read_text().splitlines()
+        self.assertEqual(len(lines), 5)
+        for line, approach in zip(lines, self.results):
+            record = json.loads(line)
+            self.assertEqual(record['designation'], approach.designation)
+            self.assertEqual(record['neo']['designation'], approach.neo.designation)
+
+    def test_compressed_output_round_trips(self):
+        path = self.root / 'results.csv.gz'
+        write_to_csv(self.results, path)
+
+        with gzip.open(path, 'rt', newline='') as infile:
+            rows = tuple(csv.DictReader(infile))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['designation'], self.results[0].designation)
+
+    def test_writer_is_chosen_by_format_suffix(self):
+        self.assertIs(writer_for('out.csv'), write_to_csv)
+        self.assertIs(writer_for('out.json.gz'), write_to_json)
+        self.assertIs(writer_for('out.jsonl'), write_to_ndjson)
+        self.assertIs(writer_for('out.ndjson.xz'), write_to_ndjson)
+        self.assertIsNone(writer_for('out.txt'))
+        self.assertIsNone(writer_for('out.gz'))
+
+
+class TestWritePipelined(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_pipelined_output_matches_direct_output(self):
+        results = build_results(1000)
+        direct, pipelined = self.root / 'direct.csv', self.root / 'pipelined.csv'
+        write_to_csv(results, direct)
+        write_pipelined(results, pipelined, batch_size=7, depth=2)
+
+        self.assertEqual(direct.read_text(), pipelined.read_text())
+
+    def test_pipelined_writer_errors_are_raised(self):
+        def failing_writer(results, filename):
+            next(iter(results))
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            write_pipelined(build_results(1000), self.root / 'out.csv', writer=failing_writer,
+                            batch_size=1, depth=1)
+
+
+class TestWritePartitioned(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_partitioned_output_has_one_file_per_designation(self):
+        results = build_results(50)
+        pattern = str(self.root / 'out' / '{designation}.csv')
+        counts = write_partitioned(results, pattern, workers=2)
+
+        designations = {approach.designation for approach in results}
+        self.assertEqual(len(counts), len(designations))
+        self.assertEqual(sum(counts.values()), 50)
+        for path, count in counts.items():
+            with open(path, newline='') as infile:
+                rows = tuple(csv.DictReader(infile))
+            self.assertEqual(len(rows), count)
+            self.assertEqual({row['designation'] for row in rows}, {pathlib.Path(path).stem})
+
+    def test_partitioned_output_rejects_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            write_partitioned(build_results(5), str(self.root / '{month}.csv'))
+
+    def test_concurrent_partitioned_writes(self):
+        results = build_results(50)
+        counts, errors = {}, []
+
+        def write(n):
+            try:
+                counts[n] = write_partitioned(results, str(self.root / str(n) / '{year}.csv'), workers=2)
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([sum(counts[n].values()) for n in range(4)], [50] * 4)
+
+    def test_partitioned_writes_do_not_fork_while_other_threads_run(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            with unittest.mock.patch('multiprocessing.get_context') as get_context:
+                counts = write_partitioned(build_results(50), str(self.root / '{designation}.csv'), workers=2)
+        finally:
+            stop.set()
+            thread.join()
+
+        get_context.assert_not_called()
+        self.assertEqual(sum(counts.values()), 50)
+
+
+class TestWriteToStream(unittest.TestCase):
+    def setUp(self):
+        self.results = build_results(100)
+
+    def test_text_stream_matches_str(self):
+        buf = io.StringIO()
+        write_to_stream(self.results, buf, 'text')
+        self.assertEqual(buf.getvalue().splitlines(), [str(approach) for approach in self.results])
+
+    def test_csv_stream_has_header_and_rows(self):
+        buf = io.StringIO()
+        write_to_stream(self.results, buf, 'csv')
+        buf.seek(0)
+        rows = tuple(csv.DictReader(buf))
+        self.assertEqual(len(rows), 100)
+        self.assertIn('potentially_hazardous', rows[0])
+
+    def test_ndjson_stream_has_one_record_per_line(self):
+        buf = io.StringIO()
+        write_to_stream(self.results, buf, 'ndjson')
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(json.loads(lines[-1])['designation'], self.results[-1].designation)
+
+
+class TestWriteGroupsToCSV(unittest.TestCase):
+    def setUp(self):
+        self.results = build_results(5)
+
+    def test_groups_csv_numbers_each_group(self):
+        groups = [self.results[:3], self.results[3:5]]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / 'groups.csv'
+            write_groups_to_csv(groups, path)
+            with open(path) as infile:
+                rows = tuple(csv.DictReader(infile))
+        self.assertEqual([row['group'] for row in rows], ['1', '1', '1', '2', '2'])
+        self.assertEqual(rows[3]['designation'], self.results[3].designation)
+
+
+class TestWriteNEOs(unittest.TestCase):
+    def setUp(self):
+        self.results = build_results(5)
+
+    def test_neos_are_written_one_per_row(self):
+        neos = [approach.neo for approach in self.results[:3]]
+        self.assertIs(writer_for('neos.csv.gz', NEO_WRITERS), write_neos_to_csv)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_neos_to_csv(neos, pathlib.Path(tmpdir) / 'neos.csv')
+            write_neos_to_json(neos, pathlib.Path(tmpdir) / 'neos.json')
+            with open(pathlib.Path(tmpdir) / 'neos.csv') as infile:
+                rows = tuple(csv.DictReader(infile))
+            with open(pathlib.Path(tmpdir) / 'neos.json') as infile:
+                records = json.load(infile)
+        self.assertEqual([row['designation'] for row in rows], [neo.designation for neo in neos])
+        self.assertEqual([record['designation'] for record in records], [neo.designation for neo in neos])
+        self.assertEqual(records[0]['potentially_hazardous'], neos[0].hazardous)
+
+
 if __name__ == '__main__':
     unittest.main()
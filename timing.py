@@ -0,0 +1,122 @@
+"""Measure the wall time and memory of each phase of a command.
+
+A `PhaseTimer` records a named entry for each phase of a run - such as parsing
+the data files, linking the database, scanning for matches or writing the
+results - so that a slow command can be attributed to loading, querying or
+writing.
+
+Scanning and writing are interleaved (the writer pulls results from the query
+as it goes), so a stream of results can be wrapped with `timed` to charge the
+time spent producing each result to its own phase, and that time is then left
+out of the phase that consumed the stream.
+
+Memory is reported as the peak resident set size of the process at the end of
+each phase. That is a high-water mark for the whole process, so a phase that
+raises it is the one that needed the memory.
+"""
+import contextlib
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    """Return the peak resident set size of this process, in bytes, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, but macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PhaseTimer:
+    """A recorder of the wall time and peak memory of the phases of a run.
+
+    A disabled timer records nothing, and adds no overhead to the streams it
+    wraps, so callers can time their phases unconditionally.
+    """
+
+    def __init__(self, enabled=True):
+        """Create a new `PhaseTimer`.
+
+        :param enabled: Whether to record anything at all.
+        """
+        self.enabled = enabled
+        self.seconds = {}
+        self.peaks = {}
+
+    def _record(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.peaks[name] = peak_rss()
+
+    @contextlib.contextmanager
+    def phase(self, name, excluding=()):
+        """Time the body of a `with` statement as a phase.
+
+        :param name: The name of the phase.
+        :param excluding: The names of phases timed (with `timed`) within this one, whose time to leave out.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        nested = sum(self.seconds.get(other, 0.0) for other in excluding)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = sum(self.seconds.get(other, 0.0) for other in excluding) - nested
+            self._record(name, elapsed - nested)
+
+    def timed(self, name, iterable):
+        """Charge the time spent producing each value of an iterable to a phase.
+
+        :param name: The name of the phase.
+        :param iterable: An iterable, such as the stream of results of a query.
+        :return: An iterator over the same values.
+        """
+        if not self.enabled:
+            return iter(iterable)
+        return self._timed(name, iter(iterable))
+
+    def _timed(self, name, iterator):
+        # Time is added as each value is produced (rather than once the stream
+        # is exhausted), so it is up to date even if the consumer stops early.
+        self.seconds.setdefault(name, 0.0)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.seconds[name] += time.perf_counter() - start
+                yield value
+        finally:
+            self.peaks[name] = peak_rss()
+
+    def report(self, stream=None):
+        """Print a table of the recorded phases, in the order they were first recorded.
+
+        :param stream: A text stream to print to. Defaults to `sys.stderr`.
+        """
+        if not self.enabled or not self.seconds:
+            return
+        stream = stream or sys.stderr
+        print(f"{'Phase':<24}{'Wall (s)':>10}{'Peak RSS (MiB)':>16}", file=stream)
+        for name, seconds in self.seconds.items():
+            peak = self.peaks.get(name) or peak_rss()
+            peak = f"{peak / (1 << 20):.1f}" if peak is not None else '?'
+            print(f"{name:<24}{seconds:>10.3f}{peak:>16}", file=stream)
+        print(f"{'total':<24}{sum(self.seconds.values()):>10.3f}", file=stream)
+
+    def reset(self):
+        """Forget all recorded phases."""
+        self.seconds.clear()
+        self.peaks.clear()
@@ -1,18 +1,178 @@
-"""Write a stream of close approaches to CSV or to JSON.
+"""Write a stream of close approaches to CSV, JSON or newline-delimited JSON.
 
-This module exports two functions: `write_to_csv` and `write_to_json`, each of
-which accept an `results` stream of close approaches and a path to which to
-write the data.
+This module exports three functions: `write_to_csv`, `write_to_json` and
+`write_to_ndjson`, each of which accept an `results` stream of close approaches
+and a path to which to write the data.
 
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
-extension determines which of these functions is used.
+extension determines which of these functions is used - see `writer_for`. Any
+format may additionally be compressed by appending a compression suffix (such
+as `.gz`) to the filename.
 
 You'll edit this file in Part 4.
 """
 
+import bz2
 import csv
+import datetime
+import gzip
+import itertools
 import json
+import lzma
+import multiprocessing
+import os
+import pathlib
+import queue
+import threading
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# Number of rows formatted and written to an output file at a time.
+WRITE_BATCH_SIZE = 10000
+# Size, in bytes, of the buffer used for output files.
+WRITE_BUFFER_SIZE = 1 << 20
+# Maximum number of batches waiting for the background writer of `write_pipelined`.
+PIPELINE_DEPTH = 8
+
+
+# Openers for compressed output, keyed by filename suffix.
+COMPRESSORS = {
+    '.gz': lambda filename, newline: gzip.open(filename, 'wt', compresslevel=6, newline=newline),
+    '.bz2': lambda filename, newline: bz2.open(filename, 'wt', newline=newline),
+    '.xz': lambda filename, newline: lzma.open(filename, 'wt', newline=newline),
+}
+if zstd is not None:
+    COMPRESSORS['.zst'] = lambda filename, newline: zstd.open(filename, 'wt', newline=newline)
+
+
+def split_compression(filename):
+    """Split a filename into its uncompressed name and its compression suffix.
+
+    :param filename: A Path-like object pointing to an output file.
+    :return: A tuple of the filename without any compression suffix, and that suffix (or '').
+    """
+    name = str(filename)
+    for suffix in COMPRESSORS:
+        if name.endswith(suffix):
+            return name[:-len(suffix)], suffix
+    return name, ''
+
+
+def open_output(filename, newline=None):
+    """Open a file for writing text, compressing it according to its suffix.
+
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param newline: How to translate newlines, as for the built-in `open`.
+    :return: A writable text file object.
+    """
+    compression = split_compression(filename)[1]
+    if compression:
+        return COMPRESSORS[compression](filename, newline)
+    return open(filename, mode='w', newline=newline, buffering=WRITE_BUFFER_SIZE)
+
+
+def batched(iterable, n):
+    """Group an iterable into lists of (at most) `n` values.
+
+    :param iterable: An iterable of values.
+    :param n: The maximum number of values in each batch.
+    :yield: Successive non-empty lists of values from the iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, n))
+        if not batch:
+            return
+        yield batch
+
+
+# The header row of CSV output.
+CSV_FIELDNAMES = ('datetime_utc', 'distance_au', 'velocity_km_s', 'designation', 'name',
+                  'diameter_km', 'potentially_hazardous')
+
+
+def csv_rows(results):
+    """Convert an iterable of `CloseApproach` objects into tuples of CSV fields.
+
+    The NEO-side fields (name, diameter and hazardous flag) are looked up once
+    per `NearEarthObject` and reused for every one of its close approaches.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :yield: A tuple of field values for each close approach, in `write_to_csv` column order.
+    """
+    neo_fields = {}
+    for approach in results:
+        neo = approach.neo
+        fields = neo_fields.get(neo)
+        if fields is None:
+            fields = neo_fields[neo] = (neo.name, neo.diameter, neo.hazardous)
+        yield (approach.time, approach.distance, approach.velocity, approach.designation) + fields
+
+
+def write_groups_to_csv(groups, filename):
+    """Write groups of `CloseApproach` objects to a CSV file, one row per approach.
+
+    Each row starts with the number of its group (counting from 1), followed
+    by the same fields as `write_to_csv`.
+
+    :param groups: An iterable of collections of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open_output(filename, newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(('group',) + CSV_FIELDNAMES)
+        for n, group in enumerate(groups, start=1):
+            writer.writerows((n,) + row for row in csv_rows(group))
+
+
+def stream_timeline_csv(rows, stream, metric):
+    """Write the windows of a rolling aggregation as CSV to an open text stream.
+
+    :param rows: An iterable of `(window_start, window_end, value)` tuples, as from `NEODatabase.rolling`.
+    :param stream: A writable text file object, opened with `newline=''` if it is a file.
+    :param metric: The name of the aggregated metric, used as the header of the value column.
+    """
+    def moment(dt):
+        # Windows of whole days start and end at midnight, so show just their dates.
+        return dt.date().isoformat() if dt.time() == datetime.time() else dt.isoformat(' ', 'minutes')
+
+    writer = csv.writer(stream)
+    writer.writerow(('window_start', 'window_end', metric))
+    for batch in batched(rows, WRITE_BATCH_SIZE):
+        writer.writerows((moment(start), moment(end), '' if value is None else value) for start, end, value in batch)
+
+
+def write_timeline_to_csv(rows, filename, metric):
+    """Write the windows of a rolling aggregation to a CSV file.
+
+    :param rows: An iterable of `(window_start, window_end, value)` tuples, as from `NEODatabase.rolling`.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param metric: The name of the aggregated metric, used as the header of the value column.
+    """
+    with open_output(filename, newline='') as outfile:
+        stream_timeline_csv(rows, outfile, metric)
+
+
+def stream_csv(results, stream):
+    """Write an iterable of `CloseApproach` objects as CSV to an open text stream.
+
+    Rows are built as plain tuples and handed to the CSV writer in batches of
+    `WRITE_BATCH_SIZE`.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object, opened with `newline=''` if it is a file.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(CSV_FIELDNAMES)
+    for batch in batched(csv_rows(results), WRITE_BATCH_SIZE):
+        writer.writerows(batch)
 
 
 def write_to_csv(results, filename):
@@ -22,25 +182,29 @@ def write_to_csv(results, filename):
     corresponds to the information in a single close approach from the `results`
     stream and its associated near-Earth object.
 
+    Rows are built as plain tuples and handed to the CSV writer in batches of
+    `WRITE_BATCH_SIZE`, through an output buffer of `WRITE_BUFFER_SIZE` bytes.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
-    fieldnames = ('datetime_utc', 'distance_au', 'velocity_km_s', 'designation', 'name',
-                  'diameter_km', 'potentially_hazardous')
+    with open_output(filename, newline='') as csv_file:
+        stream_csv(results, csv_file)
 
-    with open(filename, mode='w') as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-        writer.writeheader()
-        tmp_dict = iter(results)
-        while True:
-            try:
-                ans_dict = next(tmp_dict)
-                writer.writerow({'datetime_utc': ans_dict.time, 'distance_au': ans_dict.distance,
-                                 'velocity_km_s': ans_dict.velocity, 'designation': ans_dict.designation,
-                                 'name': ans_dict.neo.name,
-                                 'diameter_km': ans_dict.neo.diameter, 'potentially_hazardous': ans_dict.neo.hazardous})
-            except StopIteration:
-                break
+
+def json_record(approach):
+    """Convert a `CloseApproach` into a JSON-serializable dictionary.
+
+    :param approach: A `CloseApproach` linked to its `NearEarthObject`.
+    :return: A dictionary of the approach's attributes, with its NEO's attributes under 'neo'.
+    """
+    return {'datetime_utc': approach.time_str, 'distance_au': approach.distance,
+            'velocity_km_s': approach.velocity, 'designation': approach.designation,
+            'neo': {
+                'name': approach.neo.name, 'diameter_km': approach.neo.diameter,
+                'potentially_hazardous': approach.neo.hazardous,
+                'designation': approach.neo.designation}
+            }
 
 
 def write_to_json(results, filename):
@@ -54,22 +218,277 @@ def write_to_json(results, filename):
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
-    final_json = list()
-    with open(filename, "w") as write_file:
-        j_dict = iter(results)
+    final_json = [json_record(approach) for approach in results]
+    with open_output(filename) as write_file:
+        json.dump(final_json, write_file, indent=5)
+
+
+def stream_ndjson(results, stream):
+    """Write an iterable of `CloseApproach` objects as newline-delimited JSON to an open text stream.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object.
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    for batch in batched(results, WRITE_BATCH_SIZE):
+        stream.write(''.join(encode(json_record(approach)) + '\n' for approach in batch))
+
+
+def write_to_ndjson(results, filename):
+    """Write an iterable of `CloseApproach` objects to a newline-delimited JSON file.
+
+    Each line of the output is one compact JSON object, shaped like an element
+    of the list written by `write_to_json`. Records are streamed to the file in
+    batches, so the whole result set is never held in memory.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open_output(filename) as write_file:
+        stream_ndjson(results, write_file)
+
+
+def stream_text(results, stream):
+    """Write an iterable of `CloseApproach` objects as human-readable lines to an open text stream.
+
+    Each line is `CloseApproach.describe`, as in `str(approach)`. The display
+    name of each NEO is formatted once and reused for all of its close
+    approaches, and lines are written in batches of `WRITE_BATCH_SIZE` rather
+    than one at a time.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object.
+    """
+    names = {}
+    for batch in batched(results, WRITE_BATCH_SIZE):
+        lines = []
+        for approach in batch:
+            neo = approach.neo
+            fname = names.get(neo)
+            if fname is None:
+                fname = names[neo] = approach.display_name
+            lines.append(approach.describe(fname) + '\n')
+        stream.write(''.join(lines))
+
+
+# Renderers for each supported format of a text stream, such as standard output.
+STREAM_FORMATS = {
+    'text': stream_text,
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
+
+
+def write_to_stream(results, stream, fmt='text'):
+    """Write an iterable of `CloseApproach` objects to an open text stream in a given format.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param stream: A writable text file object, such as `sys.stdout`.
+    :param fmt: One of the keys of `STREAM_FORMATS`.
+    """
+    STREAM_FORMATS[fmt](results, stream)
+    stream.flush()
+
+
+# Writers for each supported output format, keyed by filename suffix.
+WRITERS = {
+    '.csv': write_to_csv,
+    '.json': write_to_json,
+    '.ndjson': write_to_ndjson,
+    '.jsonl': write_to_ndjson,
+}
+
+
+def writer_for(filename, writers=None):
+    """Choose the writer function for an output file from its suffixes.
+
+    The format suffix may be followed by any suffix in `COMPRESSORS`, such as
+    `results.ndjson.gz`.
+
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param writers: A dictionary of writers keyed by filename suffix. Defaults to `WRITERS`.
+    :return: One of the `write_to_*` functions, or None if the format is unsupported.
+    """
+    name = split_compression(filename)[0]
+    for suffix, writer in (writers or WRITERS).items():
+        if name.endswith(suffix):
+            return writer
+    return None
+
+
+# The header row of CSV output of NEOs.
+NEO_CSV_FIELDNAMES = ('designation', 'name', 'diameter_km', 'potentially_hazardous')
+
+
+def neo_json_record(neo):
+    """Convert a `NearEarthObject` into a JSON-serializable dictionary.
+
+    :param neo: A `NearEarthObject`.
+    :return: A dictionary of the NEO's attributes, with the same keys as under 'neo' in `json_record`.
+    """
+    return {'designation': neo.designation, 'name': neo.name, 'diameter_km': neo.diameter,
+            'potentially_hazardous': neo.hazardous}
+
+
+def write_neos_to_csv(neos, filename):
+    """Write an iterable of `NearEarthObject`s to a CSV file, one row per NEO.
+
+    :param neos: An iterable of `NearEarthObject`s.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open_output(filename, newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(NEO_CSV_FIELDNAMES)
+        for batch in batched(neos, WRITE_BATCH_SIZE):
+            writer.writerows((neo.designation, neo.name, neo.diameter, neo.hazardous) for neo in batch)
+
+
+def write_neos_to_json(neos, filename):
+    """Write an iterable of `NearEarthObject`s to a JSON file, as a list of `neo_json_record`s.
+
+    :param neos: An iterable of `NearEarthObject`s.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open_output(filename) as outfile:
+        json.dump([neo_json_record(neo) for neo in neos], outfile, indent=5)
+
+
+# Writers of NEOs for each supported output format, keyed by filename suffix.
+NEO_WRITERS = {
+    '.csv': write_neos_to_csv,
+    '.json': write_neos_to_json,
+}
+
+
+def write_pipelined(results, filename, writer=None, batch_size=WRITE_BATCH_SIZE, depth=PIPELINE_DEPTH):
+    """Write an iterable of `CloseApproach` objects from a background writer thread.
+
+    The calling thread pulls from `results` (typically a running query) and
+    fills a bounded queue with batches of approaches, while a writer thread
+    drains the queue and serializes them, so that formatting, compression and
+    disk I/O overlap with the scan. If the queue is full, the caller waits for
+    the writer to catch up.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param writer: One of the `write_to_*` functions. Defaults to `writer_for(filename)`.
+    :param batch_size: The number of approaches in each queued batch.
+    :param depth: The maximum number of batches waiting in the queue.
+    """
+    writer = writer or writer_for(filename)
+    if writer is None:
+        raise ValueError(f"Unsupported output format: {filename}")
+
+    batches = queue.Queue(maxsize=depth)
+    errors = []
+
+    def drain():
         while True:
-            try:
-                json_dict = next(j_dict)
-
-                final_dict = {'datetime_utc': json_dict.time_str, 'distance_au': json_dict.distance,
-                              'velocity_km_s': json_dict.velocity, 'designation': json_dict.designation,
-                              "neo": {
-                                  'name': json_dict.neo.name, 'diameter_km': json_dict.neo.diameter,
-                                  'potentially_hazardous': json_dict.neo.hazardous,
-                                  'designation': json_dict.neo.designation}
-                              }
-                final_json.append(final_dict)
-            except StopIteration:
+            batch = batches.get()
+            if batch is None:
+                return
+            yield from batch
+
+    def run():
+        try:
+            writer(drain(), filename)
+        except BaseException as err:
+            errors.append(err)
+            # Keep consuming so that the producer is never blocked on a full queue.
+            while batches.get() is not None:
+                pass
+
+    thread = threading.Thread(target=run, name='neo-writer', daemon=True)
+    thread.start()
+    try:
+        for batch in batched(results, batch_size):
+            if errors:
                 break
+            batches.put(batch)
+    finally:
+        batches.put(None)
+        thread.join()
 
-        json.dump(final_json, write_file, indent=5)
+    if errors:
+        raise errors[0]
+
+
+def partition_path(pattern, approach):
+    """Format the output path of the partition to which a close approach belongs.
+
+    :param pattern: A `str.format` pattern using the `{year}` and/or `{designation}` fields.
+    :param approach: A `CloseApproach`.
+    :return: The path of the approach's partition, as a string.
+    """
+    return pattern.format(year=approach.time.year, designation=approach.designation.replace('/', '_'))
+
+
+def _write_partition(partitions, path):
+    """Write one partition, creating its parent directories.
+
+    :param partitions: A dictionary mapping each partition's path to its close approaches.
+    :param path: The path of the partition to write.
+    :return: The number of close approaches written.
+    """
+    pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+    writer_for(path)(partitions[path], path)
+    return len(partitions[path])
+
+
+# The partitions of the `write_partitioned` call that started this worker process (only set in the workers).
+_worker_partitions = None
+
+
+def _init_partition_worker(partitions):
+    """Keep the partitions that a forked worker process of `write_partitioned` is to write."""
+    global _worker_partitions
+    _worker_partitions = partitions
+
+
+def _write_worker_partition(path):
+    """Write one partition from a worker process of `write_partitioned`."""
+    return _write_partition(_worker_partitions, path)
+
+
+def write_partitioned(results, pattern, workers=None):
+    """Write an iterable of `CloseApproach` objects to one file per year or per NEO.
+
+    The results are grouped in a single pass by the path that `pattern` formats
+    for them (for example, `out/{year}.csv` or `out/{designation}.json.gz`),
+    and the partitions are then written in parallel by a pool of forked worker
+    processes, which share the already-loaded approaches with this process
+    instead of receiving a pickled copy. Where `fork` is unavailable, with a
+    single worker, or while any other thread is running in this process, the
+    partitions are written one after another.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param pattern: A `str.format` pattern using the `{year}` and/or `{designation}` fields.
+    :param workers: The number of worker processes. Defaults to the number of CPUs.
+    :return: A dictionary mapping each written path to its number of close approaches.
+    """
+    try:
+        template = pattern.format(year=2000, designation='sample')
+    except (KeyError, IndexError) as err:
+        raise ValueError(f"Unsupported field in output pattern: {err}") from err
+    if writer_for(template) is None:
+        raise ValueError(f"Unsupported output format: {pattern}")
+
+    partitions = {}
+    for approach in results:
+        path = partition_path(pattern, approach)
+        if path not in partitions:
+            partitions[path] = []
+        partitions[path].append(approach)
+
+    workers = min(workers or os.cpu_count() or 1, len(partitions))
+    # Forking a process that has other threads running (such as a `serve` worker thread or a
+    # background loader) is unsafe, whichever thread forks: a lock held by another thread stays held in the child.
+    forkable = 'fork' in multiprocessing.get_all_start_methods()
+    if workers > 1 and forkable and threading.active_count() == 1:
+        # Each worker inherits this call's partitions when it is forked, instead of receiving a pickled copy.
+        with multiprocessing.get_context('fork').Pool(workers, _init_partition_worker, (partitions,)) as pool:
+            counts = pool.map(_write_worker_partition, partitions)
+    else:
+        counts = [_write_partition(partitions, path) for path in partitions]
+
+    return dict(zip(partitions, counts))